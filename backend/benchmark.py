@@ -0,0 +1,247 @@
+import argparse
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+import platform
+import subprocess
+import cv2
+import numpy as np
+
+ENGINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'engine.py')
+
+METHODS = ['append', 'steganography', 'datareel']
+
+PAYLOAD_KINDS = ['random', 'text']
+
+# Words for the compressible payload; repeated, but shuffled so deflate still has work to do.
+TEXT_WORDS = b"video vault frame pixel archive payload carrier manifest reel segment header checksum".split()
+
+def parse_size(text):
+    """Parses sizes such as 4096, 64K or 8M into bytes."""
+    text = text.strip().upper()
+    units = {'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+    if text[-1:] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+def make_carrier(path, width, height, frames, seed):
+    """Writes a deterministic FFV1 carrier: a moving gradient with seeded noise, so it is not trivially flat."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'FFV1'), 30, (width, height))
+    for i in range(frames):
+        base = (x + y + i * 4) % 256
+        frame = np.dstack([base, np.roll(base, i, axis=1), 255 - base]).astype(np.int16)
+        frame += rng.integers(-8, 9, size=frame.shape, dtype=np.int16)
+        out.write(np.clip(frame, 0, 255).astype(np.uint8))
+    out.release()
+
+def make_payload(path, kind, size, seed):
+    """Writes size bytes of incompressible random data or compressible text."""
+    rng = np.random.default_rng(seed)
+    if kind == 'random':
+        data = rng.integers(0, 256, size=size, dtype=np.uint8).tobytes()
+    else:
+        words = [TEXT_WORDS[i] for i in rng.integers(0, len(TEXT_WORDS), size=size // 4 + 1)]
+        data = b' '.join(words)[:size]
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def run_engine(args):
+    """Runs one engine command with --metrics; returns (seconds, startup seconds, peak RSS in MB, last progress message).
+
+    seconds is the engine's own 'total' stage, i.e. the command as a warm --serve worker runs it; the rest of
+    the wall-clock time (interpreter start-up and imports) is returned as the start-up time.
+    """
+    env = dict(os.environ)
+    # Keep runs reproducible and offline: without a key the manifest step skips the AI call.
+    env.pop('GEMINI_API_KEY', None)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, ENGINE_PATH, '--metrics'] + args, capture_output=True, text=True, env=env)
+    wall_seconds = time.perf_counter() - start
+    seconds = None
+    peak = None
+    message = ''
+    for line in proc.stdout.splitlines():
+        if line.startswith('METRICS:'):
+            record = json.loads(line[len('METRICS:'):])
+            if record.get('stage') == 'total':
+                seconds = record['seconds']
+            # Each run is a fresh engine process, so its lifetime peak is this run's peak.
+            rss = record.get('process_peak_rss_mb')
+            if rss is not None:
+                peak = max(peak or 0, rss)
+        elif line.startswith('PROGRESS:'):
+            message = line.split(':', 2)[2]
+    if proc.returncode != 0:
+        message = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+    if seconds is None:
+        seconds = wall_seconds
+    return seconds, wall_seconds - seconds, peak, message
+
+def same_contents(expected_path, actual_path):
+    """True if actual_path exists and is byte-for-byte identical to expected_path."""
+    if not os.path.exists(actual_path):
+        return False
+    with open(expected_path, 'rb') as expected, open(actual_path, 'rb') as actual:
+        return expected.read() == actual.read()
+
+def frame_count(path):
+    """Number of frames OpenCV reports for a video file."""
+    cap = cv2.VideoCapture(path)
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return count
+
+def run_case(workdir, method, carrier, payload, repeat):
+    """Times encode and decode of one method/carrier/payload combination; returns its result record."""
+    carrier_path, (width, height, frames) = carrier
+    payload_path, kind, size = payload
+    record = {
+        'case': f"{method}/{width}x{height}x{frames}/{kind}/{size}" if method != 'datareel' else f"{method}/{kind}/{size}",
+        'method': method,
+        'carrier': None if method == 'datareel' else {'width': width, 'height': height, 'frames': frames},
+        'payload': {'kind': kind, 'bytes': size},
+    }
+    if method == 'steganography' and (size + 512) * 8 > width * height * 3 * frames:
+        record['skipped'] = "payload exceeds carrier capacity"
+        return record
+
+    output_path = os.path.join(workdir, 'encoded.mp4' if method == 'append' else 'encoded.avi')
+    output_dir = os.path.join(workdir, 'decoded')
+    inputs = [payload_path] if method == 'datareel' else [carrier_path, payload_path]
+    encode_times, decode_times, encode_peaks, decode_peaks = [], [], [], []
+    encode_startups, decode_startups = [], []
+    verified = True
+    for _ in range(repeat):
+        shutil.rmtree(output_dir, ignore_errors=True)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        seconds, startup, peak, message = run_engine(['--method', method, '--mode', 'encode', '--output', output_path] + inputs)
+        if not os.path.exists(output_path):
+            record['error'] = f"encode failed: {message}"
+            return record
+        encode_times.append(seconds)
+        encode_startups.append(startup)
+        encode_peaks.append(peak)
+        seconds, startup, peak, message = run_engine(['--method', method, '--mode', 'decode', '--output', output_dir, output_path])
+        decode_times.append(seconds)
+        decode_startups.append(startup)
+        decode_peaks.append(peak)
+        if not same_contents(payload_path, os.path.join(output_dir, os.path.basename(payload_path))):
+            verified = False
+            record['error'] = f"decode did not recover the payload: {message}"
+
+    output_bytes = os.path.getsize(output_path)
+    carrier_bytes = 0 if method == 'datareel' else os.path.getsize(carrier_path)
+    video_frames = frame_count(output_path) if method != 'append' else frames
+    encode_seconds = min(encode_times)
+    decode_seconds = min(decode_times)
+    record.update({
+        'verified': verified,
+        'encode': {
+            'seconds': round(encode_seconds, 4),
+            'mb_per_sec': round(size / encode_seconds / 1e6, 3),
+            'frames_per_sec': round(video_frames / encode_seconds, 2),
+            'startup_seconds': round(min(encode_startups), 4),
+            'peak_rss_mb': max((p for p in encode_peaks if p is not None), default=None),
+        },
+        'decode': {
+            'seconds': round(decode_seconds, 4),
+            'mb_per_sec': round(size / decode_seconds / 1e6, 3),
+            'frames_per_sec': round(video_frames / decode_seconds, 2),
+            'startup_seconds': round(min(decode_startups), 4),
+            'peak_rss_mb': max((p for p in decode_peaks if p is not None), default=None),
+        },
+        'output_bytes': output_bytes,
+        'overhead_bytes': output_bytes - carrier_bytes - size,
+        'overhead_ratio': round((output_bytes - carrier_bytes) / size, 4) if size else None,
+    })
+    return record
+
+def compare_results(baseline_path, results):
+    """Prints encode/decode MB/s changes against an earlier results file, case by case."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {record['case']: record for record in json.load(f)['results']}
+    print(f"{'case':48} {'encode MB/s':>22} {'decode MB/s':>22}")
+    for record in results:
+        old = baseline.get(record['case'])
+        if not old or 'encode' not in record or 'encode' not in old:
+            continue
+        columns = []
+        for phase in ('encode', 'decode'):
+            before, after = old[phase]['mb_per_sec'], record[phase]['mb_per_sec']
+            change = (after - before) / before * 100 if before else 0.0
+            columns.append(f"{before:8.2f} -> {after:8.2f} {change:+5.0f}%")
+        print(f"{record['case']:48} {columns[0]:>22} {columns[1]:>22}")
+
+def main():
+    parser = argparse.ArgumentParser(description="VideoVault encode/decode benchmark")
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=METHODS)
+    parser.add_argument('--resolutions', nargs='+', default=['320x240', '1280x720'], help="Carrier sizes as WIDTHxHEIGHT.")
+    parser.add_argument('--frames', nargs='+', type=int, default=[30, 120], help="Carrier lengths in frames.")
+    parser.add_argument('--sizes', nargs='+', default=['64K', '1M'], help="Payload sizes (e.g. 64K, 1M).")
+    parser.add_argument('--kinds', nargs='+', choices=PAYLOAD_KINDS, default=PAYLOAD_KINDS)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case; the fastest is recorded.")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the JSON results.")
+    parser.add_argument('--compare', help="Earlier results file to compare against.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='vv_bench_')
+    try:
+        carriers = []
+        for resolution in args.resolutions:
+            width, height = (int(v) for v in resolution.lower().split('x'))
+            for frames in args.frames:
+                path = os.path.join(workdir, f"carrier_{width}x{height}x{frames}.avi")
+                make_carrier(path, width, height, frames, args.seed)
+                carriers.append((path, (width, height, frames)))
+        payloads = []
+        for kind in args.kinds:
+            for size in (parse_size(text) for text in args.sizes):
+                path = os.path.join(workdir, f"payload_{kind}_{size}.bin")
+                make_payload(path, kind, size, args.seed)
+                payloads.append((path, kind, size))
+
+        results = []
+        for method in args.methods:
+            # Data-Reel builds its own video, so the carrier does not matter.
+            for carrier in (carriers[:1] if method == 'datareel' else carriers):
+                for payload in payloads:
+                    record = run_case(workdir, method, carrier, payload, args.repeat)
+                    results.append(record)
+                    if 'encode' in record:
+                        status = "ok" if record['verified'] else "MISMATCH"
+                        print(f"{record['case']:48} encode {record['encode']['mb_per_sec']:8.2f} MB/s  "
+                              f"decode {record['decode']['mb_per_sec']:8.2f} MB/s  {status}")
+                    else:
+                        print(f"{record['case']:48} {record.get('skipped') or record.get('error')}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare_results(args.compare, results)
+    failed = [record for record in results if record.get('error')]
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,313 +1,1595 @@
 import argparse
 import sys
+import io
 import os
 import zipfile
-import cv2
-import numpy as np
+import json
+import csv
 import hashlib
 import struct
+import zlib
+import queue
+import threading
+import itertools
+import shutil
+import tempfile
+import mmap
+import contextlib
+import functools
+import copy
+import time
+import multiprocessing
+import contextvars
+import importlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+class LazyModule:
+    """Imports a module on first attribute access, so jobs that never touch it never pay for the import."""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.module = None
+
+    def __getattr__(self, name):
+        if self.module is None:
+            self.module = self.loader()
+        return getattr(self.module, name)
+
+# Plain import statements (rather than importlib) keep these visible to PyInstaller's dependency scan.
+def load_cv2():
+    import cv2
+    return cv2
+
+def load_numpy():
+    import numpy
+    return numpy
+
+def load_genai():
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        return None
+    return genai
+
+cv2 = LazyModule(load_cv2)
+np = LazyModule(load_numpy)
+
+# Job ID of the --serve request being handled on this thread; None for a normal one-shot CLI run.
+CURRENT_JOB = contextvars.ContextVar('current_job', default=None)
+
+# Where emit_event sends events instead of stdout (batch workers record them for the job summary).
+EVENT_SINK = contextvars.ContextVar('event_sink', default=None)
+
+# True while the job on this thread was started with --metrics.
+METRICS = contextvars.ContextVar('metrics', default=False)
+
+OUTPUT_LOCK = threading.Lock()
+
+# Progress is sent when the whole percentage changes, otherwise at most once per interval (seconds).
+PROGRESS_INTERVAL = 0.1
+
+# Last progress update sent from this thread, for rate limiting.
+PROGRESS_STATE = threading.local()
 
 CONTAINER_MAGIC_NUMBER = b'VVAULT_C'
 
 APPEND_MAGIC_NUMBER = b'VVAULT' 
 
-def get_ai_password():
-    if not genai:
-        return "Error: Gemini library not installed. Please run 'pip install google-generativeai'."
+APPEND_FOOTER_MAGIC = b'VVAULT_F'
+
+# Fixed-size trailer at the very end of Append files: magic, container offset, container size, CRC32.
+APPEND_FOOTER = struct.Struct('>8sQQI')
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Largest RIFF chunk written when joining AVI segments; beyond this the file continues in OpenDML AVIX chunks.
+AVI_RIFF_LIMIT = 1024 * 1024 * 1024
+
+ARCHIVE_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Memory the frame pipeline may hold in queued frames; large frames get a shallower queue.
+PIPELINE_BUFFER_BYTES = 256 * 1024 * 1024
+
+ENTROPY_SAMPLE_SIZE = 64 * 1024
+
+# Formats that are already compressed; deflating them again only costs time.
+STORED_EXTENSIONS = {
+    '.mp4', '.mov', '.avi', '.mkv', '.webm', '.m4v', '.mp3', '.m4a', '.aac', '.ogg', '.opus', '.flac',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.avif',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.zst', '.docx', '.xlsx', '.pptx', '.epub', '.jar', '.apk',
+}
+
+# Default deflate level per method: Append favours speed, the video methods favour fewer frames.
+DEFAULT_COMPRESSION_LEVELS = {'append': 6, 'steganography': 9, 'datareel': 9}
+
+DATAREEL_MAGIC = b'VREEL'
+
+DATAREEL_FRAMED_MAGIC = b'VREL3'
+
+REEL_FRAME_HEADER = struct.Struct('>III')
+
+# Files whose leading MANIFEST_TEXT_CHARS characters are sent to the model for the manifest.
+MANIFEST_TEXT_EXTENSIONS = ('.txt', '.md', '.py', '.js', '.html', '.css')
+
+MANIFEST_TEXT_CHARS = 2000
+
+# Steganography header, embedded at one LSB per value: magic, LSB depth (1-4), payload size.
+# Videos without the magic use the original layout: an 8-byte size, then the payload at one LSB.
+STEGO_MAGIC = b'VSTG'
+
+STEGO_HEADER = struct.Struct('>4sBQ')
+
+# Zip bytes per entry besides its name (local header and central directory record) and for the end record.
+ZIP_ENTRY_OVERHEAD = 30 + 46
+
+# Data descriptor after an entry's data; only written when the archive is streamed to an unseekable file.
+ZIP_DATA_DESCRIPTOR_SIZE = 16
+
+ZIP_END_RECORD_SIZE = 22
+
+# Rough throughput of raw frame bytes for the capacity planner's time estimates; calibrate with backend/benchmark.py.
+PLAN_CODEC_BYTES_PER_SEC = 60 * 1024 * 1024
+
+PLAN_DECODE_BYTES_PER_SEC = 150 * 1024 * 1024
+
+PLAN_EMBED_BYTES_PER_SEC = 400 * 1024 * 1024
+
+GEMINI_MODEL_NAME = 'gemini-pro'
+
+# Total size of the on-disk AI manifest cache; least recently used entries are evicted beyond it.
+MANIFEST_CACHE_MAX_BYTES = 1024 * 1024
+
+def model_client_name():
+    """Identifies the model the AI features would use: the VIDEOVAULT_MODEL_CLIENT spec or the Gemini model."""
+    return os.getenv("VIDEOVAULT_MODEL_CLIENT") or f"gemini:{GEMINI_MODEL_NAME}"
+
+def load_model_client():
+    """Returns a prompt -> text callable for the AI features, or None if no model is available.
+
+    VIDEOVAULT_MODEL_CLIENT=module:function plugs in any other callable instead of Gemini, e.g. a local
+    stub so tests and benchmarks never touch the network.
+    """
+    spec = os.getenv("VIDEOVAULT_MODEL_CLIENT")
+    if spec:
+        module_name, _, attribute = spec.partition(':')
+        return getattr(importlib.import_module(module_name), attribute)
+    genai = load_genai()
     api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
+    if not genai or not api_key:
+        return None
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return lambda prompt: model.generate_content(prompt).text
+
+def get_ai_password():
+    try:
+        client = load_model_client()
+    except Exception as e:
+        return f"Error: Could not load the AI model client. Details: {e}"
+    if client is None:
+        if not load_genai():
+            return "Error: Gemini library not installed. Please run 'pip install google-generativeai'."
         return "Error: GEMINI_API_KEY environment variable not set."
     
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-pro')
         prompt = "Generate a single, secure, 16-character password with uppercase, lowercase, numbers, and symbols. Provide only the password text and nothing else."
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        return client(prompt).strip()
     except Exception as e:
         return f"Error: AI call failed. Details: {e}"
 
-def get_ai_manifest(file_paths):
-    if not genai:
-        return "AI disabled. Please run 'pip install google-generativeai'."
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        return "AI disabled. GEMINI_API_KEY not set."
-    
-    content_to_summarize = ""
+def manifest_cache_dir():
+    """Directory of cached AI manifests (VIDEOVAULT_CACHE_DIR overrides the per-user cache location)."""
+    root = os.getenv("VIDEOVAULT_CACHE_DIR")
+    if not root:
+        base = os.getenv("LOCALAPPDATA") or os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        root = os.path.join(base, "videovault")
+    return os.path.join(root, "manifests")
+
+def read_cached_manifest(key):
+    """Returns the cached manifest for key (marking it recently used), or None."""
+    path = os.path.join(manifest_cache_dir(), key + ".txt")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = f.read()
+        os.utime(path)
+        return manifest
+    except OSError:
+        return None
+
+def write_cached_manifest(key, manifest):
+    """Stores a manifest, then evicts least recently used entries until the cache is under MANIFEST_CACHE_MAX_BYTES."""
+    cache_dir = manifest_cache_dir()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = os.path.join(cache_dir, f"{key}.{os.getpid()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(manifest)
+        os.replace(temp_path, os.path.join(cache_dir, key + ".txt"))
+        entries = []
+        for entry in os.scandir(cache_dir):
+            if entry.name.endswith(".txt"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= MANIFEST_CACHE_MAX_BYTES:
+                break
+            os.remove(path)
+            total -= size
+    except OSError:
+        # The cache only saves a model call; a read-only or full disk must not fail the encode.
+        pass
+
+def is_manifest_text(name):
+    """True for the file types whose contents are summarized into the manifest."""
+    return name.lower().endswith(MANIFEST_TEXT_EXTENSIONS)
+
+def read_manifest_sources(file_paths):
+    """(name, leading text) of every text file in file_paths, as they are fed to the manifest prompt."""
+    sources = []
     for file_path in file_paths:
-        if file_path.lower().endswith(('.txt', '.md', '.py', '.js', '.html', '.css')):
+        if is_manifest_text(file_path):
             try:
                 with open(file_path, 'r', errors='ignore') as f:
-                    content_to_summarize += f"--- Content from {os.path.basename(file_path)} ---\n"
-                    content_to_summarize += f.read(2000) + "\n\n"
+                    sources.append((os.path.basename(file_path), f.read(MANIFEST_TEXT_CHARS)))
             except Exception:
                 continue
+    return sources
+
+def summarize_manifest(sources):
+    """One-sentence AI summary of (name, text) sources, cached by a hash of the model and the text sent to it."""
+    content_to_summarize = ""
+    for name, text in sources:
+        content_to_summarize += f"--- Content from {name} ---\n"
+        content_to_summarize += text + "\n\n"
     
     if not content_to_summarize:
         return "No text-based files found to summarize."
 
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-pro')
-        prompt = f"""Summarize the following file content into a concise, one-sentence "manifest". Example: 'Contains Python scripts and project notes.'
+    prompt = f"""Summarize the following file content into a concise, one-sentence "manifest". Example: 'Contains Python scripts and project notes.'
 
 Here is the content:
 {content_to_summarize[:10000]}"""
-        
-        response = model.generate_content(prompt)
-        return response.text.strip().replace('\n', ' ')
+    # The prompt is everything the model sees, so identical file sets hash to the same entry; the model is
+    # part of the key so that a stub client's output is never served in place of a real summary.
+    key = hashlib.sha256(f"{model_client_name()}\n{prompt}".encode('utf-8')).hexdigest()
+    cached = read_cached_manifest(key)
+    if cached is not None:
+        return cached
+
+    try:
+        client = load_model_client()
+    except Exception as e:
+        return f"Error: Could not load the AI model client. Details: {e}"
+    if client is None:
+        if not load_genai():
+            return "AI disabled. Please run 'pip install google-generativeai'."
+        return "AI disabled. GEMINI_API_KEY not set."
+    try:
+        manifest = client(prompt).strip().replace('\n', ' ')
     except Exception as e:
         return f"Error: AI summarization failed. Details: {e}"
+    write_cached_manifest(key, manifest)
+    return manifest
 
-def peek_manifest_append(video_path):
-    with open(video_path, 'rb') as f:
-        data = f.read()
-    magic_pos = data.rfind(CONTAINER_MAGIC_NUMBER)
-    if magic_pos == -1:
-        return "No manifest found (likely an older file format or not using the Append method)."
-    
-    header_start = magic_pos + len(CONTAINER_MAGIC_NUMBER)
-    container_size = struct.unpack('>Q', data[header_start:header_start + 8])[0]
-    container_data = data[header_start + 8 : header_start + 8 + container_size]
-    
-    temp_container_path = "peek_container.zip"
-    with open(temp_container_path, 'wb') as f:
-        f.write(container_data)
+def locate_container(mm):
+    """Finds the appended archive in a mapped file; returns (offset, size, has_manifest, crc) or None.
+
+    New files are located from the fixed-size footer alone. Files written before the footer existed
+    fall back to scanning backwards for the VVAULT_C / VVAULT header, and carry no checksum (crc is None).
+    """
+    file_size = len(mm)
+    if file_size >= APPEND_FOOTER.size:
+        magic, offset, size, crc = APPEND_FOOTER.unpack(mm[file_size - APPEND_FOOTER.size:])
+        if magic == APPEND_FOOTER_MAGIC and offset + size <= file_size - APPEND_FOOTER.size:
+            return offset, size, True, crc
+    for magic, has_manifest in ((CONTAINER_MAGIC_NUMBER, True), (APPEND_MAGIC_NUMBER, False)):
+        magic_pos = mm.rfind(magic)
+        if magic_pos != -1:
+            header_start = magic_pos + len(magic)
+            size = struct.unpack('>Q', mm[header_start:header_start + 8])[0]
+            return header_start + 8, size, has_manifest, None
+    return None
+
+@contextlib.contextmanager
+def map_file(f):
+    """Read-only mmap of an open file, or empty bytes for an empty file (which mmap rejects)."""
+    if os.fstat(f.fileno()).st_size == 0:
+        yield b''
+        return
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
     try:
-        with zipfile.ZipFile(temp_container_path, 'r') as zf:
-            manifest = zf.read('manifest.txt').decode('utf-8')
-            return manifest
-    except Exception as e:
-        return f"Could not read manifest: {e}"
+        yield mm
     finally:
-        if os.path.exists(temp_container_path):
-            os.remove(temp_container_path)
+        mm.close()
+
+class SeekableReader(io.RawIOBase):
+    """Read-only random-access file: subclasses set `size` and `pos` and implement readinto from `pos`."""
 
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.pos = max(offset, 0)
+        return self.pos
+
+class BufferView(SeekableReader):
+    """Seekable read-only file over a slice of a buffer (such as an mmap), without copying it."""
+
+    def __init__(self, buffer, offset=0, size=None):
+        self.base = memoryview(buffer)
+        self.view = self.base[offset : offset + size if size is not None else None]
+        self.size = len(self.view)
+        self.pos = 0
+
+    def readinto(self, buffer):
+        n = max(min(len(buffer), self.size - self.pos), 0)
+        buffer[:n] = self.view[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+    def close(self):
+        self.view.release()
+        self.base.release()
+        super().close()
+
+def open_payload(container_zf, mm, container_offset):
+    """Opens payload.zip inside a container; a stored entry is mapped straight onto the source file."""
+    info = container_zf.getinfo('payload.zip')
+    if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+        return container_zf.open(info)
+    local_header = container_offset + info.header_offset
+    name_len, extra_len = struct.unpack('<HH', mm[local_header + 26 : local_header + 30])
+    return BufferView(mm, local_header + 30 + name_len + extra_len, info.file_size)
+
+def peek_manifest_append(video_path):
+    with open(video_path, 'rb') as f, map_file(f) as mm:
+        location = locate_container(mm)
+        if location is None or not location[2]:
+            return "No manifest found (likely an older file format or not using the Append method)."
+        offset, container_size, _, _ = location
+        try:
+            with BufferView(mm, offset, container_size) as container, zipfile.ZipFile(container, 'r') as zf:
+                manifest = zf.read('manifest.txt').decode('utf-8')
+                return manifest
+        except Exception as e:
+            return f"Could not read manifest: {e}"
+
+
+def emit_event(event, **fields):
+    """Writes one JSON-lines event for the current --serve job to stdout."""
+    sink = EVENT_SINK.get()
+    if sink is not None:
+        sink({'id': CURRENT_JOB.get(), 'event': event, **fields})
+        return
+    line = json.dumps({'id': CURRENT_JOB.get(), 'event': event, **fields})
+    with OUTPUT_LOCK:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
 
 def report_progress(percentage, message=""):
-    """Prints progress to stdout so the Electron app can read it."""
-    print(f"PROGRESS:{int(percentage)}:{message}")
+    """Prints progress to stdout so the Electron app can read it.
+
+    Updates that keep the same whole percentage are dropped if one was sent less than PROGRESS_INTERVAL
+    ago, so per-frame calls cost no I/O on high frame-rate videos. 0% and 100% always go through.
+    """
+    percent = int(percentage)
+    now = time.monotonic()
+    if (0 < percent < 100 and percent == getattr(PROGRESS_STATE, 'percent', None)
+            and now - PROGRESS_STATE.sent < PROGRESS_INTERVAL):
+        return
+    PROGRESS_STATE.percent = percent
+    PROGRESS_STATE.sent = now
+    if CURRENT_JOB.get() is not None:
+        emit_event('progress', percent=percent, message=message)
+        return
+    print(f"PROGRESS:{percent}:{message}")
+    sys.stdout.flush()
+
+def report_result(result):
+    """Reports the text result of an AI task or a file listing."""
+    if CURRENT_JOB.get() is not None:
+        emit_event('result', result=result)
+        return
+    print(f"AI_RESULT:{result}")
+
+def process_peak_rss():
+    """Peak resident memory of this process and its finished worker processes in MB, or None where unknown.
+
+    This is the high-water mark over the whole process lifetime, not the current job's: in a --serve
+    worker or a batch pool process it includes every earlier job.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def report_metric(stage, seconds, bytes_count=0, frames=0, files=0):
+    """Reports the timing of one stage of a --metrics job as a METRICS:{json} line or a 'metric' event."""
+    if not METRICS.get():
+        return
+    record = {
+        'stage': stage,
+        'seconds': round(seconds, 4),
+        'bytes': bytes_count,
+        'bytes_per_sec': round(bytes_count / seconds) if seconds > 0 else None,
+        'frames': frames,
+        'frames_per_sec': round(frames / seconds, 2) if seconds > 0 else None,
+        'files': files,
+        'process_peak_rss_mb': process_peak_rss(),
+    }
+    if CURRENT_JOB.get() is not None:
+        emit_event('metric', **record)
+        return
+    print(f"METRICS:{json.dumps(record)}")
     sys.stdout.flush()
 
-def create_zip_archive(file_paths, temp_zip_path, password):
-    """Creates a password-protected zip archive from a list of files."""
+@contextlib.contextmanager
+def measure_stage(stage, bytes_count=0, frames=0, files=0):
+    """Times the enclosed block as one --metrics stage; the yielded dict's 'bytes'/'frames'/'files' can be filled in."""
+    counts = {'bytes': bytes_count, 'frames': frames, 'files': files}
+    start = time.perf_counter()
+    yield counts
+    report_metric(stage, time.perf_counter() - start, counts['bytes'], counts['frames'], counts['files'])
+
+def report_error(message):
+    """Reports a usage error; on stderr for the CLI, as an event for --serve jobs."""
+    if CURRENT_JOB.get() is not None:
+        emit_event('error', message=message)
+        return
+    print(f"ERROR: {message}", file=sys.stderr)
+
+def is_incompressible(file_path):
+    """True for already-compressed content, judged by extension or by the byte entropy of a leading sample."""
+    if os.path.splitext(file_path)[1].lower() in STORED_EXTENSIONS:
+        return True
+    with open(file_path, 'rb') as f:
+        sample = f.read(ENTROPY_SAMPLE_SIZE)
+    if len(sample) < 4096:
+        return False
+    counts = np.bincount(np.frombuffer(sample, dtype=np.uint8), minlength=256)
+    probabilities = counts[counts > 0] / len(sample)
+    return -(probabilities * np.log2(probabilities)).sum() > 7.5
+
+def compress_chunk(chunk, level, final):
+    """Raw-deflates one chunk; non-final chunks end on a sync flush so the pieces concatenate into one stream."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(chunk) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class PrecompressedStream:
+    """Stands in for a zip entry's compressor, emitting the deflate output the thread pool already produced."""
+
+    def __init__(self):
+        self.pending = deque()
+
+    def compress(self, data):
+        return self.pending.popleft().result()
+
+    def flush(self):
+        return b''
 
-    with zipfile.ZipFile(temp_zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+@functools.lru_cache(maxsize=None)
+def precompressed_entries_supported():
+    """True if zipfile entry writers still compress through a replaceable `_compressor` attribute.
+
+    That is a CPython implementation detail (checked on CPython 3.8 to 3.13); when it is missing,
+    create_zip_archive falls back to plain ZipFile.write on one thread.
+    """
+    with zipfile.ZipFile(io.BytesIO(), 'w', zipfile.ZIP_DEFLATED) as zf, zf.open('probe', 'w') as entry:
+        compressor = getattr(entry, '_compressor', None)
+        return compressor is not None and hasattr(compressor, 'compress') and hasattr(compressor, 'flush')
+
+def read_archive_chunks(file_paths, level):
+    """Yields (path, stored, chunk, final) for every file, reading one chunk ahead to flag each file's last chunk."""
+    for file_path in file_paths:
+        stored = level == 0 or is_incompressible(file_path)
+        with open(file_path, 'rb') as f:
+            chunk = f.read(ARCHIVE_CHUNK_SIZE)
+            while True:
+                next_chunk = f.read(ARCHIVE_CHUNK_SIZE)
+                yield file_path, stored, chunk, not next_chunk
+                if not next_chunk:
+                    break
+                chunk = next_chunk
+
+def create_zip_archive(file_paths, temp_zip_path, password, level=6, append=False):
+    """Creates a password-protected zip archive from a list of files, at a path or into an open stream.
+
+    Files are deflated in chunks on a thread pool (zlib releases the GIL) while the archive is written in
+    order. Content that is already compressed is stored as-is. With append=True the files are added to an
+    existing archive instead.
+    """
+    workers = os.cpu_count() or 1
+    with measure_stage('zip', sum(os.path.getsize(path) for path in file_paths), files=len(file_paths)), \
+            zipfile.ZipFile(temp_zip_path, 'a' if append else 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zf, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
         if password:
             zf.setpassword(password.encode('utf-8'))
-        for i, file_path in enumerate(file_paths):
-            zf.write(file_path, os.path.basename(file_path))
+        if not precompressed_entries_supported():
+            for file_path in file_paths:
+                stored = level == 0 or is_incompressible(file_path)
+                zf.write(file_path, os.path.basename(file_path), zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED)
+            return
+        in_flight = deque()
+        entry = None
 
-def encode_append(video_path, file_paths, output_path, password):
-    """Appends a zipped archive (with AI manifest) to the end of a video file."""
-    payload_zip_path = "payload.zip"
-    container_zip_path = "container.zip"
-    
+        def write_next():
+            nonlocal entry
+            file_path, stored, chunk, final, future = in_flight.popleft()
+            if entry is None:
+                zinfo = zipfile.ZipInfo.from_file(file_path, os.path.basename(file_path))
+                zinfo.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+                entry = zf.open(zinfo, 'w')
+                if not stored:
+                    entry._compressor = PrecompressedStream()
+            if future is not None:
+                entry._compressor.pending.append(future)
+            entry.write(chunk)
+            if final:
+                entry.close()
+                entry = None
+
+        for file_path, stored, chunk, final in read_archive_chunks(file_paths, level):
+            future = None if stored else pool.submit(compress_chunk, chunk, level, final)
+            in_flight.append((file_path, stored, chunk, final, future))
+            if len(in_flight) > workers * 2:
+                write_next()
+        while in_flight:
+            write_next()
+
+@contextlib.contextmanager
+def replace_on_success(output_path):
+    """Yields a new file beside output_path that replaces it only if the block completes; otherwise it is deleted.
+
+    The output may even be the input being read: it is not touched until the new file is complete.
+    """
+    # A plain open() (unlike mkstemp) gives the file the usual umask permissions.
+    temp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.part"
     try:
-        report_progress(5, "Generating AI manifest...")
-        manifest_text = get_ai_manifest(file_paths)
-        report_progress(10, f"AI Manifest: {manifest_text}")
-
-        report_progress(15, "Zipping files...")
-        create_zip_archive(file_paths, payload_zip_path, password)
-
-        with zipfile.ZipFile(container_zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            zf.write(payload_zip_path, 'payload.zip')
-            zf.writestr('manifest.txt', manifest_text)
-        
-        report_progress(20, "Container created. Appending to video...")
-        
-        with open(video_path, 'rb') as f_video, open(container_zip_path, 'rb') as f_zip:
-            video_data = f_video.read()
-            container_data = f_zip.read()
-
-        header = CONTAINER_MAGIC_NUMBER + struct.pack('>Q', len(container_data))
-        with open(output_path, 'wb') as f_out:
-            f_out.write(video_data)
-            f_out.write(header)
-            f_out.write(container_data)
-        
-        report_progress(100, "Encoding complete with AI manifest!")
+        with open(temp_path, 'x+b') as f:
+            yield f
+        os.replace(temp_path, output_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
 
-    finally:
-        if os.path.exists(payload_zip_path): os.remove(payload_zip_path)
-        if os.path.exists(container_zip_path): os.remove(container_zip_path)
+def copy_stream(src, dst, length=None):
+    """Copies length bytes (default: the rest) of src to dst in constant memory, in-kernel where the OS allows it."""
+    remaining = length if length is not None else os.fstat(src.fileno()).st_size - src.tell()
+    dst.flush()
+    copy_range = getattr(os, 'copy_file_range', None)
+    if copy_range is not None:
+        try:
+            while remaining > 0:
+                copied = copy_range(src.fileno(), dst.fileno(), min(remaining, COPY_CHUNK_SIZE * 64))
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            pass
+        # copy_file_range moves the OS file offsets; resync the Python-level buffers with them.
+        src.seek(os.lseek(src.fileno(), 0, os.SEEK_CUR))
+        dst.seek(os.lseek(dst.fileno(), 0, os.SEEK_CUR))
+    while remaining > 0:
+        chunk = src.read(min(remaining, COPY_CHUNK_SIZE))
+        if not chunk:
+            break
+        dst.write(chunk)
+        remaining -= len(chunk)
 
+def timed_manifest(sources):
+    """summarize_manifest, timed as the 'manifest' stage."""
+    with measure_stage('manifest'):
+        return summarize_manifest(sources)
+
+def start_manifest(sources):
+    """Starts generating the manifest on a background thread; returns its future."""
+    manifest_pool = ThreadPoolExecutor(max_workers=1)
+    future = manifest_pool.submit(contextvars.copy_context().run, timed_manifest, sources)
+    manifest_pool.shutdown(wait=False)
+    return future
+
+class ChecksumWriter:
+    """Write-only pass-through that keeps a running CRC-32 of everything written to the underlying file.
+
+    It is deliberately not seekable, so zipfile writes strictly in order (using data descriptors) and
+    never rewrites bytes the checksum has already covered.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+        self.size = 0
+
+    def write(self, data):
+        self.f.write(data)
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        raise io.UnsupportedOperation("seek")
+
+    def flush(self):
+        self.f.flush()
+
+def write_container(f_out, write_payload, manifest_future):
+    """Writes a VVAULT_C container at f_out's position: header, container zip and footer.
+
+    write_payload(stream) writes payload.zip; the manifest is awaited only after that.
+    """
+    header_pos = f_out.tell()
+    # The size is patched in once the container has been streamed out behind the header.
+    f_out.write(CONTAINER_MAGIC_NUMBER + struct.pack('>Q', 0))
+    container_start = f_out.tell()
+
+    checksummed = ChecksumWriter(f_out)
+    with zipfile.ZipFile(checksummed, 'w', zipfile.ZIP_DEFLATED) as zf:
+        # Stored, so decode can read the payload in place and it is not deflated a second time.
+        payload_info = zipfile.ZipInfo('payload.zip', date_time=time.localtime()[:6])
+        payload_info.compress_type = zipfile.ZIP_STORED
+        with zf.open(payload_info, 'w', force_zip64=True) as payload_stream:
+            write_payload(payload_stream)
+        manifest_text = manifest_future.result()
+        report_progress(80, f"AI Manifest: {manifest_text}")
+        zf.writestr('manifest.txt', manifest_text)
+
+    container_end = f_out.tell()
+    container_size = container_end - container_start
+    f_out.seek(header_pos + len(CONTAINER_MAGIC_NUMBER))
+    f_out.write(struct.pack('>Q', container_size))
+    f_out.seek(container_end)
+    f_out.write(APPEND_FOOTER.pack(APPEND_FOOTER_MAGIC, container_start, container_size, checksummed.crc))
+
+def encode_append(video_path, file_paths, output_path, password, level=DEFAULT_COMPRESSION_LEVELS['append']):
+    """Streams a video and a zipped container (with AI manifest) into the output file in a single pass.
+
+    The manifest is generated on a background thread while the carrier is copied and the files are zipped;
+    it is only needed once the payload has been written.
+    """
+    report_progress(5, "Generating AI manifest in the background...")
+    manifest_future = start_manifest(read_manifest_sources(file_paths))
+
+    report_progress(15, "Copying carrier video...")
+    try:
+        with replace_on_success(output_path) as f_out:
+            with open(video_path, 'rb') as f_video, measure_stage('copy', os.path.getsize(video_path)):
+                copy_stream(f_video, f_out)
+            report_progress(20, "Zipping files into container...")
+            write_container(f_out, lambda stream: create_zip_archive(file_paths, stream, password, level), manifest_future)
+    except OSError as e:
+        report_progress(100, f"Error: Encoding failed; nothing was written. Details: {e}")
+        return
+
+    report_progress(100, "Encoding complete with AI manifest!")
+
+@functools.lru_cache(maxsize=None)
+def raw_member_copy_supported():
+    """True if the zipfile internals copy_raw_member writes through are all present.
+
+    They are CPython implementation details (checked on CPython 3.8 to 3.13); when any is missing,
+    copy_raw_member decompresses and recompresses the member instead.
+    """
+    with zipfile.ZipFile(io.BytesIO(), 'w') as zf:
+        internals = ('fp', 'filelist', 'NameToInfo', 'start_dir', '_didModify')
+        return hasattr(zipfile.ZipInfo, 'FileHeader') and all(hasattr(zf, name) for name in internals)
+
+def strip_extra_fields(extra, header_id):
+    """Returns a zip extra field with every block of the given header id removed."""
+    kept = []
+    pos = 0
+    while pos + 4 <= len(extra):
+        block_id, length = struct.unpack('<HH', extra[pos:pos + 4])
+        if block_id != header_id:
+            kept.append(extra[pos:pos + 4 + length])
+        pos += 4 + length
+    return b''.join(kept)
+
+def copy_raw_member(source_zf, info, zf):
+    """Copies one member of source_zf into zf as its stored compressed bytes, without recompressing it."""
+    if not raw_member_copy_supported():
+        zinfo = zipfile.ZipInfo(info.filename, info.date_time)
+        zinfo.compress_type = info.compress_type
+        zinfo.external_attr = info.external_attr
+        zinfo.comment = info.comment
+        with source_zf.open(info) as src, zf.open(zinfo, 'w', force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        return
+    fp = source_zf.fp
+    fp.seek(info.header_offset)
+    local_header = fp.read(30)
+    if local_header[:4] != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    name_len, extra_len = struct.unpack('<HH', local_header[26:30])
+    fp.seek(info.header_offset + 30 + name_len + extra_len)
 
-def decode_append(video_path, output_dir, password):
-    """Extracts an appended zip archive from a video file, handling manifest."""
+    zinfo = copy.copy(info)
+    # Sizes and CRC are known up front, so the copy needs neither a data descriptor nor the old ZIP64 field.
+    zinfo.flag_bits &= ~0x08
+    zinfo.extra = strip_extra_fields(info.extra, 1)
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    zinfo.header_offset = zf.fp.tell()
+    zf.fp.write(zinfo.FileHeader(zip64))
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = fp.read(min(remaining, COPY_CHUNK_SIZE))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated data for {info.filename}")
+        zf.fp.write(chunk)
+        remaining -= len(chunk)
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
+    zf.start_dir = zf.fp.tell()
+    zf._didModify = True
+
+def member_manifest_source(zf, info, pwd):
+    """(name, leading text) of a text member, read the way read_manifest_sources reads a file; None if unreadable."""
+    try:
+        with zf.open(info, pwd=pwd) as member:
+            return info.filename, io.TextIOWrapper(member, errors='ignore').read(MANIFEST_TEXT_CHARS)
+    except Exception:
+        return None
+
+def update_append(vault_path, file_paths, password, remove=(), level=DEFAULT_COMPRESSION_LEVELS['append']):
+    """Adds, replaces or removes files in an Append vault in place, leaving the carrier video untouched.
+
+    Members that are kept are copied as their existing compressed bytes into a new payload, which is spooled
+    to a temporary file; only then is the old container truncated off and the new one written in its place.
+    If that write fails, the old container is restored. The work is proportional to the payload, not to the
+    carrier.
+    """
+    new_names = [os.path.basename(path) for path in file_paths]
+    pwd = password.encode('utf-8') if password else None
+    report_progress(0, "Locating existing container...")
+    try:
+        with open(vault_path, 'r+b') as f, tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(vault_path))) as spool:
+            with map_file(f) as mm:
+                location = locate_container(mm)
+                if location is None or not location[2]:
+                    report_progress(100, "Error: No updatable vault found (only Append vaults with a manifest can be updated).")
+                    return
+                offset, size, _, crc = location
+                header_pos = offset - len(CONTAINER_MAGIC_NUMBER) - 8
+                if mm[header_pos:offset - 8] != CONTAINER_MAGIC_NUMBER:
+                    report_progress(100, "Error: Container header not found where the footer points.")
+                    return
+                if crc is not None:
+                    with memoryview(mm) as view, view[offset : offset + size] as container_data:
+                        if zlib.crc32(container_data) != crc:
+                            report_progress(100, "Error: Checksum mismatch. Hidden data is corrupted.")
+                            return
+
+                with BufferView(mm, offset, size) as container, \
+                        zipfile.ZipFile(container, 'r') as container_zf, \
+                        open_payload(container_zf, mm, offset) as payload, \
+                        zipfile.ZipFile(payload, 'r') as payload_zf:
+                    missing = [name for name in remove if name not in payload_zf.NameToInfo]
+                    if missing:
+                        report_progress(100, f"Error: Not found in vault: {', '.join(missing)}")
+                        return
+                    dropped = set(remove) | set(new_names)
+                    kept = [info for info in payload_zf.infolist() if info.filename not in dropped]
+
+                    sources = [member_manifest_source(payload_zf, info, pwd) for info in kept if is_manifest_text(info.filename)]
+                    manifest_future = start_manifest([source for source in sources if source] + read_manifest_sources(file_paths))
+
+                    report_progress(20, f"Keeping {len(kept)} file(s), adding {len(file_paths)}, removing {len(set(remove))}...")
+                    with measure_stage('copy_members', sum(info.compress_size for info in kept), files=len(kept)):
+                        with zipfile.ZipFile(spool, 'w', zipfile.ZIP_DEFLATED) as spool_zf:
+                            for info in kept:
+                                copy_raw_member(payload_zf, info, spool_zf)
+                    create_zip_archive(file_paths, spool, password, level, append=True)
+                # Kept until the new container is written: about one payload of memory buys a safe rollback.
+                old_container = mm[header_pos:]
+
+            # Nothing in the vault has changed up to here; from now on the old container is replaced.
+            report_progress(60, "Writing updated container...")
+            f.truncate(header_pos)
+            f.seek(header_pos)
+
+            def write_payload(stream):
+                spool.seek(0)
+                shutil.copyfileobj(spool, stream, COPY_CHUNK_SIZE)
+
+            try:
+                write_container(f, write_payload, manifest_future)
+            except BaseException:
+                # Put the old container back, so a failed rewrite never loses the hidden data.
+                f.truncate(header_pos)
+                f.seek(header_pos)
+                f.write(old_container)
+                f.flush()
+                raise
+    except (OSError, zipfile.BadZipFile) as e:
+        report_progress(100, f"Error: Update failed; the vault was left unchanged. Details: {e}")
+        return
+    report_progress(100, "Vault updated.")
+
+def report_members(zf):
+    """Reports the archive's file list (name, size, compressed size, modification time) as a JSON result."""
+    entries = [
+        {
+            'name': info.filename,
+            'size': info.file_size,
+            'compressed_size': info.compress_size,
+            'modified': '%04d-%02d-%02dT%02d:%02d:%02d' % info.date_time,
+        }
+        for info in zf.infolist() if not info.is_dir()
+    ]
+    report_result(json.dumps(entries))
+    report_progress(100, f"{len(entries)} file(s) in archive.")
+
+def extract_members(zf, output_dir, password, members):
+    """Extracts only the named members of zf, which reads just their entries."""
+    missing = [name for name in members if name not in zf.NameToInfo]
+    if missing:
+        report_progress(100, f"Error: Not found in archive: {', '.join(missing)}")
+        return
+    pwd = password.encode('utf-8') if password else None
+    for i, name in enumerate(members):
+        extract_archive(zf, output_dir, pwd, [name])
+        report_progress(10 + (i + 1) / len(members) * 90, f"Extracted {name}")
+    report_progress(100, f"{len(members)} file(s) extracted to {output_dir}")
+
+def extract_archive(zf, output_dir, pwd, members=None):
+    """Extracts all of zf (or just members) into output_dir, timed as the 'extract' stage."""
+    names = set(members) if members else None
+    size = sum(info.file_size for info in zf.infolist() if names is None or info.filename in names)
+    with measure_stage('extract', size, files=len(names) if names else len(zf.infolist())):
+        zf.extractall(path=output_dir, members=members, pwd=pwd)
+
+@contextlib.contextmanager
+def open_append_archive(mm, location):
+    """Opens the hidden archive of an Append vault in place: payload.zip for containers, the container itself for old files."""
+    offset, size, has_manifest, _ = location
+    with BufferView(mm, offset, size) as container, zipfile.ZipFile(container, 'r') as container_zf:
+        if not has_manifest:
+            yield container_zf
+            return
+        with open_payload(container_zf, mm, offset) as payload, zipfile.ZipFile(payload, 'r') as payload_zf:
+            yield payload_zf
+
+def decode_append(video_path, output_dir, password, members=None):
+    """Extracts an appended zip archive (or just the named members) from a video file, handling manifest.
+
+    Member extraction reads only the zip central directory and the requested entries, so the container
+    checksum (which would read everything) is left to the per-member CRCs.
+    """
     report_progress(0, "Searching for hidden data...")
-    with open(video_path, 'rb') as f:
-        data = f.read()
-
-    magic_pos = data.rfind(CONTAINER_MAGIC_NUMBER)
-    if magic_pos != -1:
-        report_progress(10, "New format with manifest detected.")
-        header_start = magic_pos + len(CONTAINER_MAGIC_NUMBER)
-        container_size = struct.unpack('>Q', data[header_start:header_start + 8])[0]
-        container_data = data[header_start + 8 : header_start + 8 + container_size]
-        
-        temp_container_path = "extracted_container.zip"
-        with open(temp_container_path, 'wb') as f_zip:
-            f_zip.write(container_data)
-        
+    with open(video_path, 'rb') as f, map_file(f) as mm:
+        location = locate_container(mm)
+        if location is None:
+            report_progress(100, "Error: No hidden data found (magic number missing).")
+            return
+        offset, size, has_manifest, crc = location
+        if crc is not None and not members:
+            with memoryview(mm) as view, view[offset : offset + size] as container_data, measure_stage('checksum', size):
+                if zlib.crc32(container_data) != crc:
+                    report_progress(100, "Error: Checksum mismatch. Hidden data is corrupted.")
+                    return
         try:
-            with zipfile.ZipFile(temp_container_path, 'r') as container_zf:
-                payload_data = container_zf.read('payload.zip')
-                temp_payload_path = "extracted_payload.zip"
-                with open(temp_payload_path, 'wb') as f_payload:
-                    f_payload.write(payload_data)
-                
-                with zipfile.ZipFile(temp_payload_path, 'r') as payload_zf:
-                    pwd = password.encode('utf-8') if password else None
-                    payload_zf.extractall(path=output_dir, pwd=pwd)
-                
-                report_progress(100, f"Success! Files extracted to {output_dir}")
-                os.remove(temp_payload_path)
-
+            with open_append_archive(mm, location) as zf:
+                if members:
+                    extract_members(zf, output_dir, password, members)
+                elif has_manifest:
+                    report_progress(10, "New format with manifest detected.")
+                    extract_archive(zf, output_dir, password.encode('utf-8') if password else None)
+                    report_progress(100, f"Success! Files extracted to {output_dir}")
+                else:
+                    report_progress(10, "Old format detected. No manifest available.")
+                    extract_archive(zf, output_dir, password.encode('utf-8') if password else None)
+                    report_progress(100, f"Files successfully extracted to {output_dir}")
         except Exception as e:
             report_progress(100, f"Error: Extraction failed. Incorrect password or corrupted data. Details: {e}")
-        finally:
-            if os.path.exists(temp_container_path):
-                os.remove(temp_container_path)
-    else:
-        magic_pos = data.rfind(APPEND_MAGIC_NUMBER)
-        if magic_pos == -1:
+
+def list_append(video_path):
+    """Lists the files in an Append vault from the zip central directory alone."""
+    with open(video_path, 'rb') as f, map_file(f) as mm:
+        location = locate_container(mm)
+        if location is None:
             report_progress(100, "Error: No hidden data found (magic number missing).")
             return
-        
-        report_progress(10, "Old format detected. No manifest available.")
-        header_start = magic_pos + len(APPEND_MAGIC_NUMBER)
-        zip_size = struct.unpack('>Q', data[header_start:header_start + 8])[0]
-        zip_data = data[header_start + 8 : header_start + 8 + zip_size]
-        temp_zip_path = "extracted_temp.zip"
-        with open(temp_zip_path, 'wb') as f_zip:
-            f_zip.write(zip_data)
         try:
-            with zipfile.ZipFile(temp_zip_path, 'r') as zf:
-                pwd = password.encode('utf-8') if password else None
-                zf.extractall(path=output_dir, pwd=pwd)
-            report_progress(100, f"Files successfully extracted to {output_dir}")
-        except RuntimeError:
-            report_progress(100, "Error: Extraction failed. Incorrect password or corrupted data.")
+            with open_append_archive(mm, location) as zf:
+                report_members(zf)
+        except zipfile.BadZipFile as e:
+            report_progress(100, f"Error: Hidden archive is corrupted. Details: {e}")
+
+def read_frames(cap):
+    """Yields decoded frames from an open capture until the stream ends."""
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            return
+        yield frame
+
+def timed_stages(source, process, sink, stages):
+    """Wraps the three pipeline callables to add up busy time, frames and bytes per stage for --metrics."""
+    totals = {name: [0.0, 0, 0] for name in stages if name}
+    lock = threading.Lock()
+
+    def account(name, start, result):
+        if name:
+            with lock:
+                entry = totals[name]
+                entry[0] += time.perf_counter() - start
+                entry[1] += 1
+                entry[2] += getattr(result, 'nbytes', 0)
+
+    def timed_source():
+        iterator = iter(source)
+        while True:
+            start = time.perf_counter()
+            try:
+                frame = next(iterator)
+            except StopIteration:
+                return
+            account(stages[0], start, frame)
+            yield frame
+
+    def timed_process(index, frame):
+        start = time.perf_counter()
+        result = process(index, frame)
+        account(stages[1], start, result)
+        return result
+
+    def timed_sink(index, result):
+        start = time.perf_counter()
+        keep_going = sink(index, result)
+        account(stages[2], start, result)
+        return keep_going
+
+    def report():
+        for name, (seconds, frames, bytes_count) in totals.items():
+            report_metric(name, seconds, bytes_count, frames)
+
+    return timed_source(), timed_process, timed_sink, report
+
+def process_pool(workers):
+    """ProcessPoolExecutor whose workers are spawned rather than forked.
+
+    The engine always has other threads running by the time it needs a pool (the --serve reader and job
+    threads, manifest and pipeline threads), and a fork can copy a lock such as OUTPUT_LOCK while it is held.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+def run_frame_pipeline(source, process, sink, workers=None, depth=None, stages=None, frame_bytes=None):
+    """Overlaps frame decoding, per-frame processing and ordered output.
+
+    source is iterated on a reader thread (e.g. read_frames(cap)), process(index, frame) runs on a thread
+    pool, and sink(index, result) is called in frame order on the calling thread. sink may return False
+    to stop early. At most `depth` frames are queued at any time; by default two per worker, capped so that
+    frames of frame_bytes stay within PIPELINE_BUFFER_BYTES. OpenCV I/O and large NumPy operations release
+    the GIL, so codec work and bit manipulation run on separate cores.
+
+    stages names the (source, process, sink) steps for --metrics; each reports its summed busy time, so a
+    stage that runs on several threads can show more seconds than the pipeline took.
+    """
+    report_stages = None
+    if stages and METRICS.get():
+        source, process, sink, report_stages = timed_stages(source, process, sink, stages)
+    workers = workers or os.cpu_count() or 1
+    if not depth:
+        depth = workers * 2
+        if frame_bytes:
+            # A queued frame holds both its input and its result.
+            depth = max(1, min(depth, PIPELINE_BUFFER_BYTES // (2 * frame_bytes)))
+    pending = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    reader_errors = []
+
+    def reader():
+        try:
+            for index, frame in enumerate(source):
+                if stop.is_set():
+                    break
+                pending.put(pool.submit(process, index, frame))
+        except BaseException as e:
+            reader_errors.append(e)
+        finally:
+            pending.put(None)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        reader_thread = threading.Thread(target=reader, daemon=True)
+        reader_thread.start()
+        index = 0
+        future = object()
+        try:
+            while True:
+                future = pending.get()
+                if future is None:
+                    break
+                if sink(index, future.result()) is False:
+                    break
+                index += 1
         finally:
-            if os.path.exists(temp_zip_path):
-                os.remove(temp_zip_path)
+            stop.set()
+            # Drain so a reader blocked on the full queue can see the stop flag and exit.
+            while future is not None:
+                future = pending.get()
+                if future is not None:
+                    future.cancel()
+            reader_thread.join()
+    if reader_errors:
+        raise reader_errors[0]
+    if report_stages:
+        report_stages()
+
+def payload_bits(data, bit_start, bit_count):
+    """Returns bit_count bits of data, starting at bit_start, as a uint8 array of 0/1 values."""
+    byte_start = bit_start // 8
+    byte_end = (bit_start + bit_count + 7) // 8
+    chunk = np.frombuffer(data, dtype=np.uint8, count=byte_end - byte_start, offset=byte_start)
+    skip = bit_start % 8
+    return np.unpackbits(chunk)[skip:skip + bit_count]
+
+def read_avi_frames(path):
+    """Lists (data offset, size, keyframe) for each video frame chunk of an AVI, including OpenDML extensions."""
+    frames = []
+    keyframes = {}
+    with open(path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        pos = 0
+        while pos + 12 <= file_size:
+            f.seek(pos)
+            riff_id, riff_size, _ = struct.unpack('<4sI4s', f.read(12))
+            if riff_id != b'RIFF':
+                break
+            riff_end = min(pos + 8 + riff_size, file_size)
+            movi_pos = None
+            child = pos + 12
+            while child + 8 <= riff_end:
+                f.seek(child)
+                chunk_id, size = struct.unpack('<4sI', f.read(8))
+                if chunk_id == b'LIST' and f.read(4) == b'movi':
+                    movi_pos = child + 8
+                    entry = child + 12
+                    while entry + 8 <= child + 8 + size:
+                        f.seek(entry)
+                        entry_id, entry_size = struct.unpack('<4sI', f.read(8))
+                        if entry_id[2:] in (b'dc', b'db'):
+                            frames.append((entry + 8, entry_size))
+                        elif entry_id[:2] == b'ix':
+                            _, _, _, count, _, base, _ = struct.unpack('<HBBI4sQI', f.read(24))
+                            for offset, length in struct.iter_unpack('<II', f.read(count * 8)):
+                                keyframes[base + offset] = not length & 0x80000000
+                        entry += 8 + entry_size + (entry_size & 1)
+                elif chunk_id == b'idx1' and movi_pos is not None:
+                    for entry_id, flags, offset, _ in struct.iter_unpack('<4sIII', f.read(size - size % 16)):
+                        if entry_id[2:] in (b'dc', b'db'):
+                            keyframes.setdefault(movi_pos + offset + 8, bool(flags & 0x10))
+                child += 8 + size + (size & 1)
+            pos = riff_end + (riff_size & 1)
+    return [(offset, size, keyframes.get(offset, True)) for offset, size in frames]
+
+def avi_header_layout(header):
+    """Finds the patchable fields in an AVI header (everything before the first movi list)."""
+    layout = {}
+
+    def walk(start, end, parent):
+        pos = start
+        while pos + 8 <= end:
+            chunk_id, size = struct.unpack('<4sI', header[pos:pos + 8])
+            if chunk_id == b'LIST':
+                list_type = header[pos + 8:pos + 12]
+                if list_type == b'odml':
+                    layout.setdefault('odml', (pos, size))
+                elif list_type in (b'hdrl', b'strl'):
+                    walk(pos + 12, pos + 8 + size, list_type)
+            elif chunk_id in (b'avih', b'strh'):
+                layout.setdefault(chunk_id.decode(), pos + 8)
+            elif chunk_id in (b'indx', b'JUNK') and parent == b'strl':
+                layout.setdefault('indx', (pos, size))
+            elif chunk_id == b'JUNK' and parent == b'hdrl':
+                layout.setdefault('odml', (pos, size))
+            pos += 8 + size + (size & 1)
+
+    walk(12, len(header), None)
+    return layout
+
+def avi_chunks_intact(path):
+    """True if every RIFF chunk of an AVI, and every chunk in its lists other than movi, has a readable fourcc."""
+    with open(path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+
+        def walk(start, end):
+            pos = start
+            while pos + 8 <= end:
+                f.seek(pos)
+                chunk_id, size = struct.unpack('<4sI', f.read(8))
+                if not all(32 <= c < 127 for c in chunk_id) or pos + 8 + size > file_size:
+                    return False
+                if chunk_id in (b'RIFF', b'LIST') and f.read(4) != b'movi' and not walk(pos + 12, pos + 8 + size):
+                    return False
+                pos += 8 + size + (size & 1)
+            return True
+
+        return walk(0, file_size)
 
-def to_binary(data):
-    """Convert data to a binary string."""
-    return ''.join(format(byte, '08b') for byte in data)
+def join_avi_segments(segment_paths, output_path):
+    """Concatenates AVI segments of the same stream into one OpenDML AVI without re-encoding any frame."""
+    frames = [(path, offset, size, key) for path in segment_paths for offset, size, key in read_avi_frames(path)]
+    if not frames:
+        raise ValueError("No video frames found in segments.")
+    # The header of the first segment, up to its movi list, becomes the header of the joined file.
+    with open(segment_paths[0], 'rb') as f:
+        header_end = 12
+        while True:
+            f.seek(header_end)
+            chunk_id, size = struct.unpack('<4sI', f.read(8))
+            if chunk_id == b'LIST' and f.read(4) == b'movi':
+                break
+            header_end += 8 + size + (size & 1)
+        f.seek(0)
+        header = bytearray(f.read(header_end))
+    layout = avi_header_layout(header)
+    if 'avih' not in layout or 'strh' not in layout:
+        raise ValueError("Unsupported AVI header in segment.")
 
-def encode_steganography(video_path, file_paths, output_path, password):
-    temp_zip_path = "temp_archive.zip"
+    parts = [[]]
+    part_size = 0
+    for frame in frames:
+        chunk_size = 8 + frame[2] + (frame[2] & 1) + 8
+        if parts[-1] and part_size + chunk_size > AVI_RIFF_LIMIT:
+            parts.append([])
+            part_size = 0
+        parts[-1].append(frame)
+        part_size += chunk_size
+    indx_slot, odml_slot = layout.get('indx'), layout.get('odml')
+    if len(parts) > 1 and (indx_slot is None or odml_slot is None or indx_slot[1] < 24 + 16 * len(parts) or odml_slot[1] < 16):
+        raise ValueError("Segment header has no room for an OpenDML index.")
+
+    max_size = max(frame[2] for frame in frames)
+    struct.pack_into('<I', header, layout['avih'] + 16, len(parts[0]))
+    struct.pack_into('<I', header, layout['avih'] + 28, max_size)
+    struct.pack_into('<II', header, layout['strh'] + 32, len(frames), max_size)
+
+    sources = {path: open(path, 'rb') for path in segment_paths}
     try:
-        create_zip_archive(file_paths, temp_zip_path, password)
-        with open(temp_zip_path, 'rb') as f:
-            data_to_hide = f.read()
-        data_size = len(data_to_hide)
-        header = struct.pack('>Q', data_size)
-        binary_data = to_binary(header + data_to_hide)
-        data_len = len(binary_data)
-        report_progress(10, "Data prepared for embedding.")
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            report_progress(100, "Error: Could not open video file.")
-            return
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        fourcc = cv2.VideoWriter_fourcc(*'FFV1')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        total_pixels = width * height * 3
-        max_capacity = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) * total_pixels
-        if data_len > max_capacity:
-            report_progress(100, f"Error: Data size ({data_len} bits) exceeds video capacity ({max_capacity} bits).")
-            return
-        data_idx = 0
-        frame_idx = 0
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret: break
-            if data_idx < data_len:
-                frame_flat = frame.flatten()
-                for i in range(len(frame_flat)):
-                    if data_idx < data_len:
-                        pixel_val = frame_flat[i]
-                        bit_to_hide = int(binary_data[data_idx])
-                        frame_flat[i] = (pixel_val & 0b11111110) | bit_to_hide
-                        data_idx += 1
-                    else: break
-                frame = frame_flat.reshape(frame.shape)
-            out.write(frame)
-            frame_idx += 1
-            if total_frames > 0:
-                progress = 10 + (frame_idx / total_frames * 90)
-                report_progress(progress, f"Processing frame {frame_idx}/{total_frames}")
-        cap.release()
-        out.release()
-        report_progress(100, "Steganography encoding complete.")
+        with open(output_path, 'wb') as out:
+            out.write(header)
+            super_index = []
+            for part_idx, part in enumerate(parts):
+                riff_pos = 0
+                if part_idx > 0:
+                    riff_pos = out.tell()
+                    out.write(b'RIFF\0\0\0\0AVIX')
+                movi_pos = out.tell()
+                out.write(b'LIST\0\0\0\0movi')
+                base = out.tell()
+                entries = []
+                for path, offset, size, key in part:
+                    out.write(struct.pack('<4sI', b'00dc', size))
+                    entries.append((out.tell() - base, size, key))
+                    src = sources[path]
+                    src.seek(offset)
+                    copy_stream(src, out, size)
+                    if size & 1:
+                        out.write(b'\0')
+                ix_pos = out.tell()
+                ix = struct.pack('<HBBI4sQI', 2, 0, 1, len(entries), b'00dc', base, 0)
+                ix += b''.join(struct.pack('<II', offset, size if key else size | 0x80000000) for offset, size, key in entries)
+                out.write(b'ix00' + struct.pack('<I', len(ix)) + ix)
+                super_index.append((ix_pos, 8 + len(ix), len(entries)))
+                end = out.tell()
+                out.seek(movi_pos + 4)
+                out.write(struct.pack('<I', end - movi_pos - 8))
+                out.seek(end)
+                if part_idx == 0:
+                    # idx1 offsets are relative to the 'movi' fourcc and point at chunk headers.
+                    idx1 = b''.join(struct.pack('<4sIII', b'00dc', 0x10 if key else 0, base + offset - 8 - (movi_pos + 8), size)
+                                    for offset, size, key in entries)
+                    out.write(b'idx1' + struct.pack('<I', len(idx1)) + idx1)
+                end = out.tell()
+                out.seek(riff_pos + 4)
+                out.write(struct.pack('<I', end - riff_pos - 8))
+                out.seek(end)
+
+            if indx_slot is not None and indx_slot[1] >= 24 + 16 * len(super_index):
+                pos, size = indx_slot
+                indx = struct.pack('<HBBI4s3I', 4, 0, 0, len(super_index), b'00dc', 0, 0, 0)
+                indx += b''.join(struct.pack('<QII', *entry) for entry in super_index)
+                out.seek(pos)
+                out.write(b'indx' + struct.pack('<I', size) + indx.ljust(size, b'\0'))
+            if odml_slot is not None and odml_slot[1] >= 16:
+                pos, size = odml_slot
+                out.seek(pos)
+                out.write(b'LIST' + struct.pack('<I', size) + b'odml' + b'dmlh' + struct.pack('<II', size - 12, len(frames)).ljust(size - 8, b'\0'))
     finally:
-        if os.path.exists(temp_zip_path):
-            os.remove(temp_zip_path)
+        for src in sources.values():
+            src.close()
+    if not avi_chunks_intact(output_path):
+        raise ValueError("Joined AVI has a damaged chunk header.")
+
+def stego_values(header, chunk, chunk_bit0, depth, value_start, count):
+    """LSB symbols and masks for carrier values [value_start, value_start + count).
+
+    The header takes the first len(header) * 8 values at one LSB each, so it can be read before the depth
+    is known; the payload follows at `depth` LSBs per value. chunk is the slice of the payload that starts
+    at payload bit chunk_bit0.
+    """
+    header_values = len(header) * 8
+    symbols = np.zeros(count, dtype=np.uint8)
+    masks = np.zeros(count, dtype=np.uint8)
+    used = 0
+    if value_start < header_values:
+        used = min(header_values - value_start, count)
+        symbols[:used] = payload_bits(header, value_start, used)
+        masks[:used] = 1
+    first_bit = (value_start + used - header_values) * depth - chunk_bit0
+    available = len(chunk) * 8 - first_bit
+    n = min(count - used, -(-available // depth)) if available > 0 else 0
+    if n > 0:
+        symbols[used:used + n] = bits_to_symbols(payload_bits(chunk, first_bit, min(n * depth, available)), depth)
+        masks[used:used + n] = (1 << depth) - 1
+        used += n
+    return symbols[:used], masks[:used]
+
+def embed_values(frame, symbols, masks):
+    """Replaces the masked low bits of the first len(symbols) values of frame with symbols."""
+    flat = frame.reshape(-1)
+    n = len(symbols)
+    flat[:n] &= ~masks
+    flat[:n] |= symbols
+    return frame
+
+def lsb_bits(values, depth):
+    """The low `depth` bits of every value, most significant first, as a flat 0/1 array."""
+    return np.unpackbits(values[:, None], axis=1)[:, 8 - depth:].reshape(-1)
+
+def stego_header(data_size, depth):
+    """Header for a new steganography payload: magic, LSB depth and payload size."""
+    return STEGO_HEADER.pack(STEGO_MAGIC, depth, data_size)
 
-def decode_steganography(video_path, output_dir, password):
+def stego_values_needed(header_len, data_size, depth):
+    """Carrier values (one per colour channel of a pixel) taken by a header and a data_size-byte payload."""
+    return header_len * 8 + -(-data_size * 8 // depth)
+
+def stego_capacity(total_values, depth, header_len=STEGO_HEADER.size):
+    """Largest payload in bytes that fits in total_values carrier values at the given depth."""
+    return max((total_values - header_len * 8) * depth // 8, 0)
+
+def archive_size_bounds(file_paths):
+    """(lower, upper) bound on the zip archive size for file_paths, from file sizes alone.
+
+    Incompressible files are stored, so they count in full towards both bounds; compressible ones may
+    shrink to almost nothing, so they only count towards the upper bound. So do data descriptors, which
+    are not always written.
+    """
+    overhead = ZIP_END_RECORD_SIZE
+    lower = upper = 0
+    for path in file_paths:
+        size = os.path.getsize(path)
+        overhead += ZIP_ENTRY_OVERHEAD + 2 * len(os.path.basename(path).encode('utf-8'))
+        upper += size + ZIP_DATA_DESCRIPTOR_SIZE
+        if is_incompressible(path):
+            lower += size
+    return lower + overhead, upper + overhead
+
+def plan_steganography(video_path, file_paths, depth=None):
+    """Works out from container metadata alone whether file_paths fit in video_path, at one or every LSB depth.
+
+    Reports, per depth, the capacity, whether the (not yet zipped) payload fits, the frames it touches and
+    a rough encode/decode time. Nothing is decoded, so this is instant even for long carriers.
+    """
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         report_progress(100, "Error: Could not open video file.")
         return
-    report_progress(5, "Reading video frames...")
-    binary_data = ""
-    header_len = 64
-    data_size = None
-    frame_idx = 0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    while cap.isOpened() and (data_size is None or len(binary_data) < header_len + data_size * 8):
+    cap.release()
+    frame_values = width * height * 3
+    if total_frames <= 0 or frame_values == 0:
+        report_progress(100, "Error: The video does not report its frame count or size.")
+        return
+    lower, upper = archive_size_bounds(file_paths)
+    plans = []
+    for plan_depth in ([depth] if depth else range(1, 5)):
+        capacity = stego_capacity(total_frames * frame_values, plan_depth)
+        touched = min(-(-stego_values_needed(STEGO_HEADER.size, upper, plan_depth) // frame_values), total_frames)
+        plans.append({
+            'depth': plan_depth,
+            'capacity_bytes': capacity,
+            'fits': 'yes' if upper <= capacity else 'no' if lower > capacity else 'maybe',
+            'frames_touched': touched,
+            # Every carrier frame is decoded and re-encoded; only touched frames are embedded into or read back.
+            'encode_seconds': round(total_frames * frame_values / PLAN_CODEC_BYTES_PER_SEC + touched * frame_values / PLAN_EMBED_BYTES_PER_SEC, 2),
+            'decode_seconds': round(touched * frame_values / PLAN_DECODE_BYTES_PER_SEC, 2),
+        })
+    fitting = [plan['depth'] for plan in plans if plan['fits'] != 'no']
+    report_result(json.dumps({
+        'carrier': {'width': width, 'height': height, 'fps': fps, 'frames': total_frames},
+        'payload_bytes': {'min': lower, 'max': upper},
+        'plans': plans,
+        'recommended_depth': fitting[0] if fitting else None,
+    }))
+    if fitting:
+        plan = next(plan for plan in plans if plan['depth'] == fitting[0])
+        report_progress(100, f"Fits at {plan['depth']} LSB(s) per channel: {plan['frames_touched']}/{total_frames} frames, "
+                             f"about {plan['encode_seconds']}s to encode.")
+    else:
+        depths = f"{depth} LSB(s)" if depth else "every depth"
+        report_progress(100, f"Error: Payload ({lower}-{upper} bytes) exceeds the carrier capacity at {depths}.")
+
+def encode_stego_segment(video_path, segment_path, start, end, header, chunk, chunk_bit0, depth):
+    """Process-pool worker: embeds header and its slice of the payload into frames [start, end) and encodes them to FFV1."""
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_values = width * height * 3
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    out = cv2.VideoWriter(segment_path, cv2.VideoWriter_fourcc(*'FFV1'), fps, (width, height))
+    written = 0
+    for frame_idx in range(start, end):
         ret, frame = cap.read()
-        if not ret: break
-        frame_flat = frame.flatten()
-        for pixel_val in frame_flat:
-            binary_data += str(pixel_val & 1)
-            if data_size is None and len(binary_data) == header_len:
-                header_bytes = int(binary_data, 2).to_bytes(header_len // 8, byteorder='big')
-                data_size = struct.unpack('>Q', header_bytes)[0]
-                report_progress(15, f"Header decoded. Expecting {data_size} bytes.")
-            if data_size is not None and len(binary_data) >= header_len + data_size * 8: break
-        if data_size is not None and len(binary_data) >= header_len + data_size * 8: break
-        frame_idx += 1
+        if not ret:
+            break
+        symbols, masks = stego_values(header, chunk, chunk_bit0, depth, frame_idx * frame_values, frame_values)
+        if len(symbols):
+            embed_values(frame, symbols, masks)
+        out.write(frame)
+        written += 1
+    cap.release()
+    out.release()
+    return written
+
+def encode_steganography_segments(video_path, header, data, depth, output_path, segments, total_frames, frame_values):
+    """Embeds header and data across `segments` frame ranges in parallel processes, then joins them into one AVI."""
+    header_values = len(header) * 8
+    data_bits = len(data) * 8
+    bounds = [total_frames * i // segments for i in range(segments + 1)]
+    temp_dir = tempfile.mkdtemp(prefix='vv_segments_', dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        segment_paths = [os.path.join(temp_dir, f"segment_{i:04d}.avi") for i in range(segments)]
+        futures = []
+        with measure_stage('segments', len(data), total_frames), \
+                process_pool(min(segments, os.cpu_count() or 1)) as pool:
+            for i in range(segments):
+                # Payload bits carried by this segment's values, widened to whole bytes.
+                bit_start = min(max(bounds[i] * frame_values - header_values, 0) * depth, data_bits)
+                bit_end = min(max(bounds[i + 1] * frame_values - header_values, 0) * depth, data_bits)
+                chunk = data[bit_start // 8 : (bit_end + 7) // 8]
+                futures.append(pool.submit(encode_stego_segment, video_path, segment_paths[i], bounds[i], bounds[i + 1],
+                                           header, chunk, bit_start - bit_start % 8, depth))
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                report_progress(10 + done / segments * 80, f"Encoded segment {done}/{segments}")
+        if sum(future.result() for future in futures) != total_frames:
+            raise ValueError("Carrier returned fewer frames than reported; cannot split it into segments.")
+        report_progress(90, "Joining segments...")
+        with measure_stage('join', sum(os.path.getsize(path) for path in segment_paths), total_frames):
+            join_avi_segments(segment_paths, output_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def encode_steganography(video_path, file_paths, output_path, password, level=DEFAULT_COMPRESSION_LEVELS['steganography'], segments=1, depth=1):
+    """Hides the zipped files in the low `depth` bits (1-4) of every colour value of the carrier's frames."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        report_progress(100, "Error: Could not open video file.")
+        return
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_pixels = width * height * 3
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    max_capacity = stego_capacity(total_frames * total_pixels, depth)
+    # Stored (already compressed) files alone can rule the payload out before anything is zipped.
+    min_size = archive_size_bounds(file_paths)[0]
+    if total_frames > 0 and min_size > max_capacity:
+        cap.release()
+        report_progress(100, f"Error: Data size (at least {min_size} bytes) exceeds video capacity ({max_capacity} bytes at {depth} LSB(s)).")
+        return
+    archive = io.BytesIO()
+    create_zip_archive(file_paths, archive, password, level)
+    data_to_hide = archive.getvalue()
+    data_size = len(data_to_hide)
+    header = stego_header(data_size, depth)
+    report_progress(10, "Data prepared for embedding.")
+    if data_size > max_capacity:
+        cap.release()
+        report_progress(100, f"Error: Data size ({data_size} bytes) exceeds video capacity ({max_capacity} bytes at {depth} LSB(s)).")
+        return
+    used_frames = -(-stego_values_needed(len(header), data_size, depth) // total_pixels)
+    if segments > 1 and total_frames >= segments:
+        cap.release()
+        try:
+            encode_steganography_segments(video_path, header, data_to_hide, depth, output_path, segments, total_frames, total_pixels)
+            report_progress(100, "Steganography encoding complete.")
+            return
+        except ValueError as e:
+            report_progress(10, f"Segmented encode unavailable ({e}); encoding sequentially.")
+        cap = cv2.VideoCapture(video_path)
+    fourcc = cv2.VideoWriter_fourcc(*'FFV1')
+    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+
+    def embed(frame_idx, frame):
+        if frame_idx < used_frames:
+            embed_values(frame, *stego_values(header, data_to_hide, 0, depth, frame_idx * total_pixels, frame.size))
+        return frame
+
+    def write(frame_idx, frame):
+        out.write(frame)
         if total_frames > 0:
-            progress = 15 + (frame_idx / total_frames * 75)
-            report_progress(progress, f"Scanning frame {frame_idx}/{total_frames}")
+            progress = 10 + ((frame_idx + 1) / total_frames * 90)
+            report_progress(progress, f"Processing frame {frame_idx + 1}/{total_frames}")
+
+    run_frame_pipeline(read_frames(cap), embed, write, stages=('read', 'embed', 'write'), frame_bytes=total_pixels)
     cap.release()
-    if data_size is None:
-        report_progress(100, "Error: Could not decode header. No hidden data found or data is corrupt.")
+    out.release()
+    report_progress(100, "Steganography encoding complete.")
+
+def pack_bits(bits, pending):
+    """Packs pending + bits into whole bytes; returns (bytes, leftover bits)."""
+    if len(pending):
+        bits = np.concatenate((pending, bits))
+    usable = len(bits) - len(bits) % 8
+    return np.packbits(bits[:usable]).tobytes(), bits[usable:]
+
+class SteganographyReader(SeekableReader):
+    """Seekable view of an LSB payload that decodes only the frames a read touches.
+
+    The header is read at one LSB per value. A STEGO_MAGIC header gives the depth and size; anything else
+    is the original layout (an 8-byte size, then the payload at one LSB). Payload bit b then sits in value
+    header_values + b // depth, so any byte range maps straight to the frames that hold it.
+    """
+
+    def __init__(self, video_path):
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise ValueError("Could not open video file.")
+        self.frame_values = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)) * int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) * 3
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.next_frame = 0
+        self.cached = (None, None)
+        raw = np.packbits(self.read_values(0, STEGO_HEADER.size * 8, 1)).tobytes()
+        magic, depth, size = STEGO_HEADER.unpack(raw)
+        if magic == STEGO_MAGIC and 1 <= depth <= 4:
+            self.header_values, self.depth, self.size = STEGO_HEADER.size * 8, depth, size
+        else:
+            self.header_values, self.depth, self.size = 64, 1, struct.unpack('>Q', raw[:8])[0]
+        if self.total_frames > 0 and self.size * 8 > (self.total_frames * self.frame_values - self.header_values) * self.depth:
+            raise ValueError("Could not decode header. No hidden data found or data is corrupt.")
+        self.pos = 0
+
+    def frame_flat(self, frame_idx):
+        if self.cached[0] == frame_idx:
+            return self.cached[1]
+        if frame_idx != self.next_frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        ret, frame = self.cap.read()
+        self.next_frame = frame_idx + 1
+        if not ret:
+            raise ValueError(f"Frame {frame_idx} could not be read; data is incomplete.")
+        self.cached = (frame_idx, frame.reshape(-1))
+        return self.cached[1]
+
+    def read_values(self, value_start, count, depth):
+        """The low `depth` bits of count carrier values from value_start, which may span frames."""
+        parts = []
+        while count > 0:
+            frame_idx, within = divmod(value_start, self.frame_values)
+            taken = min(count, self.frame_values - within)
+            parts.append(lsb_bits(self.frame_flat(frame_idx)[within:within + taken], depth))
+            value_start += taken
+            count -= taken
+        return np.concatenate(parts)
+
+    def payload_bits(self, bit_start, bit_count):
+        """bit_count payload bits from payload bit bit_start."""
+        first = bit_start // self.depth
+        last = -(-(bit_start + bit_count) // self.depth)
+        bits = self.read_values(self.header_values + first, last - first, self.depth)
+        skip = bit_start - first * self.depth
+        return bits[skip:skip + bit_count]
+
+    def readinto(self, buffer):
+        if self.pos >= self.size:
+            return 0
+        value = self.header_values + self.pos * 8 // self.depth
+        # Stay within the current frame where possible; a byte that straddles two frames is read alone.
+        in_frame = (self.frame_values - value % self.frame_values) * self.depth // 8
+        n = min(len(buffer), self.size - self.pos, max(in_frame, 1))
+        buffer[:n] = np.packbits(self.payload_bits(self.pos * 8, n * 8)).tobytes()
+        self.pos += n
+        return n
+
+    def close(self):
+        self.cap.release()
+        super().close()
+
+def open_steganography_archive(video_path):
+    """Buffered, seekable reader over the LSB payload that decodes frames on demand."""
+    raw = SteganographyReader(video_path)
+    return io.BufferedReader(raw, buffer_size=max(raw.frame_values * raw.depth // 8, io.DEFAULT_BUFFER_SIZE))
+
+def list_steganography(video_path):
+    """Lists the files hidden in a video's LSBs, decoding only the frames that hold the zip central directory."""
+    try:
+        with open_steganography_archive(video_path) as reader, zipfile.ZipFile(reader, 'r') as zf:
+            report_members(zf)
+    except ValueError as e:
+        report_progress(100, f"Error: {e}")
+    except zipfile.BadZipFile:
+        report_progress(100, "Error: Failed to decode. The data in the video is not a valid archive or is corrupted.")
+
+def decode_steganography(video_path, output_dir, password, members=None):
+    if members:
+        try:
+            with open_steganography_archive(video_path) as reader, zipfile.ZipFile(reader, 'r') as zf:
+                extract_members(zf, output_dir, password, members)
+        except ValueError as e:
+            report_progress(100, f"Error: {e}")
+        except (RuntimeError, zipfile.BadZipFile) as e:
+            report_progress(100, f"Error: Extraction failed. Incorrect password or corrupted data. Details: {e}")
+        return
+    report_progress(5, "Reading video frames...")
+    try:
+        with SteganographyReader(video_path) as layout:
+            header_values, depth, data_size = layout.header_values, layout.depth, layout.size
+            frame_values, total_frames = layout.frame_values, layout.total_frames
+    except ValueError as e:
+        report_progress(100, f"Error: {e}")
         return
+    report_progress(15, f"Header decoded. Expecting {data_size} bytes at {depth} LSB(s) per channel.")
+    end_value = header_values + -(-data_size * 8 // depth)
+    payload = bytearray()
+    pending = np.empty(0, dtype=np.uint8)
+
+    def unembed(frame_idx, frame):
+        start = frame_idx * frame_values
+        low, high = max(start, header_values), min(start + frame_values, end_value)
+        if low >= high:
+            return np.empty(0, dtype=np.uint8)
+        return lsb_bits(frame.reshape(-1)[low - start:high - start], depth)
+
+    def collect(frame_idx, bits):
+        nonlocal pending
+        chunk, pending = pack_bits(bits, pending)
+        payload.extend(chunk[:data_size - len(payload)])
+        if total_frames > 0:
+            progress = 15 + ((frame_idx + 1) / total_frames * 75)
+            report_progress(progress, f"Scanning frame {frame_idx + 1}/{total_frames}")
+        return len(payload) < data_size
+
     if data_size > 0:
-        payload_binary = binary_data[header_len : header_len + data_size * 8]
-        if len(payload_binary) < data_size * 8:
-             report_progress(100, "Error: Data is corrupted or incomplete.")
-             return
-        payload_bytes = int(payload_binary, 2).to_bytes(data_size, byteorder='big')
-    else:
-        payload_bytes = b''
+        cap = cv2.VideoCapture(video_path)
+        run_frame_pipeline(read_frames(cap), unembed, collect, stages=('read', 'unembed', 'collect'), frame_bytes=frame_values)
+        cap.release()
+    if len(payload) < data_size:
+        report_progress(100, "Error: Data is corrupted or incomplete.")
+        return
     report_progress(90, "Data extracted. Unzipping...")
-    temp_zip_path = "extracted_temp.zip"
-    with open(temp_zip_path, 'wb') as f:
-        f.write(payload_bytes)
     try:
-        with zipfile.ZipFile(temp_zip_path, 'r') as zf:
+        with zipfile.ZipFile(io.BytesIO(payload), 'r') as zf:
             if not zf.namelist():
                 report_progress(100, "Success: Decoded video, but it contained no hidden files.")
                 return
             pwd = password.encode('utf-8') if password else None
             try:
-                zf.extractall(path=output_dir, pwd=pwd)
+                extract_archive(zf, output_dir, pwd)
                 num_files = len(zf.namelist())
                 report_progress(100, f"Success! {num_files} file(s) extracted to {output_dir}")
             except RuntimeError as e:
@@ -319,147 +1601,700 @@ def decode_steganography(video_path, output_dir, password):
         report_progress(100, "Error: Failed to decode. The data in the video is not a valid archive or is corrupted.")
     except Exception as e:
         report_progress(100, f"An unexpected error occurred: {e}")
-    finally:
-        if os.path.exists(temp_zip_path):
-            os.remove(temp_zip_path)
 
-def encode_datareel(file_paths, output_path, password):
-    frame_width, frame_height = 640, 360
-    pixels_per_frame = frame_width * frame_height
+def datareel_levels(bits_per_symbol):
+    """Evenly spaced 8-bit intensity for each symbol value."""
+    count = 1 << bits_per_symbol
+    return (np.arange(count) * 255 // (count - 1)).astype(np.uint8)
+
+def bits_to_symbols(bits, bits_per_symbol):
+    """Groups a 0/1 bit array into symbols of bits_per_symbol bits, zero-padding the tail."""
+    pad = -len(bits) % bits_per_symbol
+    if pad:
+        bits = np.concatenate((bits, np.zeros(pad, dtype=np.uint8)))
+    weights = (1 << np.arange(bits_per_symbol - 1, -1, -1)).astype(np.uint8)
+    return bits.reshape(-1, bits_per_symbol) @ weights
+
+def symbols_to_bits(values, bits_per_symbol):
+    """Quantizes 8-bit intensities to the nearest symbol level and expands them back into bits."""
+    count = 1 << bits_per_symbol
+    symbols = ((values.astype(np.uint16) * (count - 1) + 127) // 255).astype(np.uint8)
+    return np.unpackbits(symbols[:, None], axis=1)[:, 8 - bits_per_symbol:].reshape(-1)
+
+def one_bit_values(data, channels):
+    """Spreads data at one bit per pixel (0 or 255), repeated across each channel."""
+    return np.repeat(np.unpackbits(np.frombuffer(data, dtype=np.uint8)) * 255, channels)
+
+def first_channel(frame):
+    """Per-pixel values of the first channel, where one-bit headers are read from."""
+    return (frame[:, :, 0] if frame.ndim == 3 else frame).reshape(-1)
+
+def reel_values(frame, channels):
+    """Flat symbol values of a Data-Reel frame for the given channel count."""
+    return frame.reshape(-1) if channels == 3 else first_channel(frame)
+
+def read_reel_header(frame):
+    """Parses the Data-Reel header from the first frame; returns None if the magic is unknown."""
+    pixels = first_channel(frame)
+    magic = np.packbits(pixels[:40] > 127).tobytes()
+    if magic == DATAREEL_MAGIC:
+        bits_per_symbol, channels, bytes_per_frame = 1, 1, 0
+        header_len = len(DATAREEL_MAGIC) + 32 + 8
+    elif magic == DATAREEL_FRAMED_MAGIC:
+        bits_per_symbol, channels, bytes_per_frame = struct.unpack('>BBI', np.packbits(pixels[40:88] > 127).tobytes())
+        header_len = len(DATAREEL_FRAMED_MAGIC) + 6 + 32 + 8
+    else:
+        return None
+    if not 1 <= bits_per_symbol <= 4 or channels not in (1, 3):
+        return None
+    header = np.packbits(pixels[:header_len * 8] > 127).tobytes()
+    return {
+        'magic': magic,
+        'bits_per_symbol': bits_per_symbol,
+        'channels': channels,
+        'bytes_per_frame': bytes_per_frame,
+        'header_len': header_len,
+        'checksum': header[-40:-8],
+        'data_size': struct.unpack('>Q', header[-8:])[0],
+    }
+
+def decode_reel_frame(frame, bits_per_symbol, channels, bytes_per_frame):
+    """Decodes one framed Data-Reel frame; returns (sequence number, payload bytes or None if the CRC fails)."""
+    header_bits = REEL_FRAME_HEADER.size * 8
+    seq, length, crc = REEL_FRAME_HEADER.unpack(np.packbits(first_channel(frame)[:header_bits] > 127).tobytes())
+    if length > bytes_per_frame:
+        return seq, None
+    values = reel_values(frame, channels)[header_bits * channels:]
+    symbol_count = (length * 8 + bits_per_symbol - 1) // bits_per_symbol
+    chunk = np.packbits(symbols_to_bits(values[:symbol_count], bits_per_symbol)[:length * 8]).tobytes()
+    if zlib.crc32(chunk) != crc:
+        return seq, None
+    return seq, chunk
+
+def decode_reel_range(video_path, start, end, bits_per_symbol, channels, bytes_per_frame):
+    """Process-pool worker: decodes frames [start, end) of a framed Data-Reel; returns [(frame index, bytes or None)]."""
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    results = []
+    for frame_idx in range(start, end):
+        ret, frame = cap.read()
+        if not ret:
+            results.append((frame_idx, None))
+            continue
+        seq, chunk = decode_reel_frame(frame, bits_per_symbol, channels, bytes_per_frame)
+        results.append((frame_idx, chunk if seq == frame_idx else None))
+    cap.release()
+    return results
+
+class DataReelReader(SeekableReader):
+    """Seekable view of a framed Data-Reel payload that decodes only the frames a read touches."""
+
+    def __init__(self, video_path, header):
+        self.cap = cv2.VideoCapture(video_path)
+        self.header = header
+        self.size = header['data_size']
+        self.pos = 0
+        self.next_frame = 0
+        self.cached = (None, b'')
+
+    def frame_payload(self, frame_idx):
+        if self.cached[0] == frame_idx:
+            return self.cached[1]
+        if frame_idx != self.next_frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        ret, frame = self.cap.read()
+        self.next_frame = frame_idx + 1
+        seq, chunk = (None, None)
+        if ret:
+            seq, chunk = decode_reel_frame(frame, self.header['bits_per_symbol'], self.header['channels'], self.header['bytes_per_frame'])
+        if chunk is None or seq != frame_idx:
+            raise ValueError(f"Data-Reel frame {frame_idx} is corrupt.")
+        self.cached = (frame_idx, chunk)
+        return chunk
+
+    def readinto(self, buffer):
+        if self.pos >= self.size:
+            return 0
+        bytes_per_frame = self.header['bytes_per_frame']
+        chunk = self.frame_payload(self.pos // bytes_per_frame + 1)
+        within = self.pos % bytes_per_frame
+        n = min(len(buffer), len(chunk) - within, self.size - self.pos)
+        buffer[:n] = chunk[within:within + n]
+        self.pos += n
+        return n
+
+    def close(self):
+        self.cap.release()
+        super().close()
+
+def encode_datareel(file_paths, output_path, password, frame_size=(640, 360), bits_per_symbol=2, channels=3, level=DEFAULT_COMPRESSION_LEVELS['datareel']):
+    frame_width, frame_height = frame_size
+    values_per_frame = frame_width * frame_height * channels
+    frame_shape = (frame_height, frame_width, 3) if channels == 3 else (frame_height, frame_width)
     fps = 30
-    temp_zip_path = "temp_archive.zip"
-    try:
-        create_zip_archive(file_paths, temp_zip_path, password)
-        with open(temp_zip_path, 'rb') as f:
-            data_to_hide = f.read()
-        magic = b'VREEL'
-        checksum = hashlib.sha256(data_to_hide).digest()
-        data_size_bytes = struct.pack('>Q', len(data_to_hide))
-        header = magic + checksum + data_size_bytes
-        binary_data = to_binary(header + data_to_hide)
-        data_len = len(binary_data)
-        report_progress(20, "Data prepared. Generating video frames...")
-        fourcc = cv2.VideoWriter_fourcc(*'FFV1')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height), isColor=False)
-        num_frames = (data_len + pixels_per_frame - 1) // pixels_per_frame
-        for i in range(num_frames):
-            start = i * pixels_per_frame
-            end = start + pixels_per_frame
-            chunk = binary_data[start:end].ljust(pixels_per_frame, '0')
-            pixel_values = np.array([255 if bit == '1' else 0 for bit in chunk], dtype=np.uint8)
-            frame = pixel_values.reshape((frame_height, frame_width))
-            out.write(frame)
-            if total_frames > 0:
-                progress = 20 + (i / num_frames * 80)
-                report_progress(progress, f"Writing frame {i+1}/{num_frames}")
-        out.release()
-        report_progress(100, "Data-Reel video created successfully.")
-    finally:
-        if os.path.exists(temp_zip_path):
-            os.remove(temp_zip_path)
+    # Every data frame starts with a one-bit sequence/length/CRC header, followed by whole payload bytes.
+    header_values = REEL_FRAME_HEADER.size * 8 * channels
+    bytes_per_frame = (values_per_frame - header_values) * bits_per_symbol // 8
+    reel_header_values = (len(DATAREEL_FRAMED_MAGIC) + 6 + 32 + 8) * 8 * channels
+    if bytes_per_frame <= 0 or reel_header_values > values_per_frame:
+        report_progress(100, f"Error: Frame size {frame_width}x{frame_height} is too small for the Data-Reel header.")
+        return
+    archive = io.BytesIO()
+    create_zip_archive(file_paths, archive, password, level)
+    data_to_hide = archive.getvalue()
+    checksum = hashlib.sha256(data_to_hide).digest()
+    data_size_bytes = struct.pack('>Q', len(data_to_hide))
+    reel_header = DATAREEL_FRAMED_MAGIC + struct.pack('>BBI', bits_per_symbol, channels, bytes_per_frame) + checksum + data_size_bytes
+    num_frames = 1 + (len(data_to_hide) + bytes_per_frame - 1) // bytes_per_frame
+    levels = datareel_levels(bits_per_symbol)
+    report_progress(20, "Data prepared. Generating video frames...")
+    fourcc = cv2.VideoWriter_fourcc(*'FFV1')
+    out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height), isColor=(channels == 3))
+
+    def render(i, _):
+        frame = np.zeros(values_per_frame, dtype=np.uint8)
+        if i == 0:
+            # The reel header gets a frame of its own, read at one bit per pixel before the variant is known.
+            values = one_bit_values(reel_header, channels)
+            frame[:len(values)] = values
+        else:
+            chunk = data_to_hide[(i - 1) * bytes_per_frame : i * bytes_per_frame]
+            frame[:header_values] = one_bit_values(REEL_FRAME_HEADER.pack(i, len(chunk), zlib.crc32(chunk)), channels)
+            symbols = bits_to_symbols(np.unpackbits(np.frombuffer(chunk, dtype=np.uint8)), bits_per_symbol)
+            frame[header_values:header_values + len(symbols)] = levels[symbols]
+        return frame.reshape(frame_shape)
+
+    def write(i, frame):
+        out.write(frame)
+        progress = 20 + ((i + 1) / num_frames * 80)
+        report_progress(progress, f"Writing frame {i+1}/{num_frames}")
+
+    run_frame_pipeline(range(num_frames), render, write, stages=(None, 'render', 'write'), frame_bytes=values_per_frame)
+    out.release()
+    report_progress(100, "Data-Reel video created successfully.")
+
+def read_reel_sequential(cap, frame, header, total_frames):
+    """Reads the payload of a legacy VREEL reel frame by frame, starting from the first frame."""
+    bits_per_symbol, channels, data_size = header['bits_per_symbol'], header['channels'], header['data_size']
+    payload = bytearray()
+    pending = np.empty(0, dtype=np.uint8)
+
+    def extract(frame_idx, frame):
+        values = reel_values(frame, channels)
+        if frame_idx == 0:
+            values = values[header['header_len'] * 8 * channels:]
+        return symbols_to_bits(values, bits_per_symbol)
+
+    def collect(frame_idx, bits):
+        nonlocal pending
+        chunk, pending = pack_bits(bits[:max((data_size - len(payload)) * 8 - len(pending), 0)], pending)
+        payload.extend(chunk[:data_size - len(payload)])
+        if total_frames > 0:
+            progress = 10 + ((frame_idx + 1) / total_frames * 75)
+            report_progress(progress, f"Reading frame {frame_idx + 1}/{total_frames}")
+        return len(payload) < data_size
+
+    if data_size > 0:
+        run_frame_pipeline(itertools.chain([frame], read_frames(cap)), extract, collect, stages=('read', 'unembed', 'collect'),
+                           frame_bytes=frame.nbytes)
+    return payload
+
+def read_reel_parallel(video_path, header):
+    """Decodes the frames of a framed (VREL3) reel across a process pool; returns (payload, corrupt frame indices)."""
+    data_size, bytes_per_frame = header['data_size'], header['bytes_per_frame']
+    data_frames = (data_size + bytes_per_frame - 1) // bytes_per_frame
+    workers = min(os.cpu_count() or 1, max(data_frames, 1))
+    ranges_count = min(workers * 4, max(data_frames, 1))
+    bounds = [1 + data_frames * i // ranges_count for i in range(ranges_count + 1)]
+    payload = bytearray(data_size)
+    corrupt = []
+    done = 0
+    with process_pool(workers) as pool:
+        futures = [
+            pool.submit(decode_reel_range, video_path, bounds[i], bounds[i + 1],
+                        header['bits_per_symbol'], header['channels'], bytes_per_frame)
+            for i in range(ranges_count) if bounds[i] < bounds[i + 1]
+        ]
+        for future in as_completed(futures):
+            for frame_idx, chunk in future.result():
+                start = (frame_idx - 1) * bytes_per_frame
+                expected = min(bytes_per_frame, data_size - start)
+                if chunk is None or len(chunk) != expected:
+                    corrupt.append(frame_idx)
+                else:
+                    payload[start:start + expected] = chunk
+                done += 1
+            progress = 10 + (done / max(data_frames, 1) * 75)
+            report_progress(progress, f"Decoded {done}/{data_frames} frames")
+    return payload, sorted(corrupt)
+
+def open_reel_archive(video_path, header):
+    """Buffered, seekable reader over a framed reel's payload that decodes frames on demand."""
+    return io.BufferedReader(DataReelReader(video_path, header), buffer_size=header['bytes_per_frame'])
 
-def decode_datareel(video_path, output_dir, password):
+def decode_datareel(video_path, output_dir, password, members=None):
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         report_progress(100, "Error: Could not open video file.")
         return
     report_progress(5, "Reading Data-Reel video...")
-    binary_data = ""
-    frame_idx = 0
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret: break
-        if len(frame.shape) == 3:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        _, thresh_frame = cv2.threshold(frame, 127, 255, cv2.THRESH_BINARY)
-        for row in thresh_frame:
-            for pixel in row:
-                binary_data += '1' if pixel == 255 else '0'
-        frame_idx += 1
-        if total_frames > 0:
-            progress = 5 + (frame_idx / total_frames * 75)
-            report_progress(progress, f"Reading frame {frame_idx}/{total_frames}")
-    cap.release()
-    report_progress(80, "Video read. Parsing data header...")
-    header_offset = 0
-    magic = int(binary_data[:40], 2).to_bytes(5, byteorder='big')
-    if magic != b'VREEL':
+    ret, frame = cap.read()
+    header = read_reel_header(frame) if ret else None
+    if header is None:
+        cap.release()
         report_progress(100, "Error: Not a valid Data-Reel file (magic number mismatch).")
         return
-    header_offset += 40
-    checksum_bin = binary_data[header_offset : header_offset + 256]
-    checksum = int(checksum_bin, 2).to_bytes(32, byteorder='big')
-    header_offset += 256
-    data_size_bin = binary_data[header_offset : header_offset + 64]
-    data_size = int(data_size_bin, 2)
-    header_offset += 64
-    report_progress(85, f"Header decoded. Expecting {data_size} bytes.")
-    payload_binary = binary_data[header_offset : header_offset + data_size * 8]
-    payload_bytes = int(payload_binary, 2).to_bytes(data_size, byteorder='big')
-    if hashlib.sha256(payload_bytes).digest() != checksum:
+    data_size = header['data_size']
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    report_progress(10, f"Header decoded. Expecting {data_size} bytes.")
+    if header['magic'] == DATAREEL_FRAMED_MAGIC:
+        cap.release()
+        if total_frames > 0 and data_size > (total_frames - 1) * header['bytes_per_frame']:
+            report_progress(100, "Error: Data is corrupted or incomplete.")
+            return
+        if members:
+            try:
+                with open_reel_archive(video_path, header) as reader, zipfile.ZipFile(reader, 'r') as zf:
+                    extract_members(zf, output_dir, password, members)
+            except (ValueError, RuntimeError, zipfile.BadZipFile) as e:
+                report_progress(100, f"Error: Extraction failed. Incorrect password or corrupted data. Details: {e}")
+            return
+        with measure_stage('decode_frames', data_size, (data_size + header['bytes_per_frame'] - 1) // header['bytes_per_frame']):
+            payload, corrupt = read_reel_parallel(video_path, header)
+        if corrupt:
+            shown = ', '.join(str(i) for i in corrupt[:20])
+            report_progress(100, f"Error: {len(corrupt)} corrupt frame(s) detected: {shown}")
+            return
+    else:
+        payload = read_reel_sequential(cap, frame, header, total_frames)
+        cap.release()
+    if len(payload) < data_size:
+        report_progress(100, "Error: Data is corrupted or incomplete.")
+        return
+    with measure_stage('checksum', len(payload)):
+        checksum_ok = hashlib.sha256(payload).digest() == header['checksum']
+    if not checksum_ok:
         report_progress(100, "Error: Checksum mismatch. Data is corrupted.")
         return
     report_progress(90, "Checksum OK. Extracting archive...")
-    temp_zip_path = "extracted_temp.zip"
-    with open(temp_zip_path, 'wb') as f:
-        f.write(payload_bytes)
     try:
-        with zipfile.ZipFile(temp_zip_path, 'r') as zf:
+        with zipfile.ZipFile(io.BytesIO(payload), 'r') as zf:
+            if members:
+                extract_members(zf, output_dir, password, members)
+                return
             pwd = password.encode('utf-8') if password else None
-            zf.extractall(path=output_dir, pwd=pwd)
+            extract_archive(zf, output_dir, pwd)
         report_progress(100, f"Files successfully extracted to {output_dir}")
-    except RuntimeError:
+    except (RuntimeError, KeyError):
         report_progress(100, "Error: Extraction failed. Incorrect password or corrupted data.")
-    finally:
-        if os.path.exists(temp_zip_path):
-            os.remove(temp_zip_path)
 
-if __name__ == "__main__":
+def list_datareel(video_path):
+    """Lists the files in a Data-Reel; framed reels decode only the frames holding the zip central directory."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        report_progress(100, "Error: Could not open video file.")
+        return
+    ret, frame = cap.read()
+    header = read_reel_header(frame) if ret else None
+    if header is None:
+        cap.release()
+        report_progress(100, "Error: Not a valid Data-Reel file (magic number mismatch).")
+        return
+    try:
+        if header['magic'] == DATAREEL_FRAMED_MAGIC:
+            cap.release()
+            with open_reel_archive(video_path, header) as reader, zipfile.ZipFile(reader, 'r') as zf:
+                report_members(zf)
+            return
+        # Legacy VREEL reels have no per-frame addressing, so the payload is read up to its end.
+        payload = read_reel_sequential(cap, frame, header, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        cap.release()
+        if hashlib.sha256(payload).digest() != header['checksum']:
+            report_progress(100, "Error: Checksum mismatch. Data is corrupted.")
+            return
+        with zipfile.ZipFile(io.BytesIO(payload), 'r') as zf:
+            report_members(zf)
+    except (ValueError, zipfile.BadZipFile) as e:
+        report_progress(100, f"Error: Data is corrupted or incomplete. Details: {e}")
+
+def load_batch_manifest(path):
+    """Reads batch jobs from a JSON list (or {"jobs": [...]}) or from a CSV file with a header row.
+
+    Each job has mode, method, inputs, output and password; any other key is passed on as a CLI option
+    (e.g. "segments": 4 becomes --segments 4). In CSV files, inputs are separated by ';'.
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            jobs = []
+            for row in csv.DictReader(f):
+                job = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+                job['inputs'] = [item.strip() for item in job.get('inputs', '').split(';') if item.strip()]
+                jobs.append(job)
+            return jobs
+        data = json.load(f)
+    return data['jobs'] if isinstance(data, dict) else data
+
+def batch_job_argv(job):
+    """Converts a batch job description into engine command-line arguments."""
+    argv = ['--mode', job.get('mode', 'encode')]
+    if job.get('method'):
+        argv += ['--method', job['method']]
+    if job.get('output'):
+        argv += ['--output', job['output']]
+    if job.get('password'):
+        argv += ['--password', job['password']]
+    for key, value in job.items():
+        if key in ('mode', 'method', 'output', 'password', 'inputs') or value is None or value is False:
+            continue
+        flag = '--' + key.replace('_', '-')
+        if value is True:
+            argv.append(flag)
+        elif isinstance(value, list):
+            for item in value:
+                argv += [flag, str(item)]
+        else:
+            argv += [flag, str(value)]
+    inputs = job.get('inputs', [])
+    return argv + ['--'] + [str(item) for item in (inputs if isinstance(inputs, list) else [inputs])]
+
+def job_memory_estimate(job):
+    """Rough peak memory of one job, used to size the batch pool."""
+    inputs = job.get('inputs', [])
+    inputs = inputs if isinstance(inputs, list) else [inputs]
+    input_bytes = sum(os.path.getsize(path) for path in inputs if os.path.isfile(path))
+    if job.get('method') == 'append':
+        return 128 * 1024 * 1024
+    # The video methods hold the archive in memory plus a queue of decoded frames.
+    return 256 * 1024 * 1024 + min(input_bytes * 2, 4 * 1024 * 1024 * 1024)
+
+def available_memory():
+    """Currently available physical memory in bytes, or None where the OS does not expose it.
+
+    On Linux this is MemAvailable, which counts reclaimable page cache; free pages alone would be tiny right
+    after reading large carriers.
+    """
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def batch_pool_size(jobs, requested=None):
+    """Workers for a batch: one per core, capped by job count and by how many of the largest job fit in memory."""
+    if requested:
+        return requested
+    workers = max(min(os.cpu_count() or 1, len(jobs)), 1)
+    memory = available_memory()
+    if memory:
+        workers = max(min(workers, memory // max(job_memory_estimate(job) for job in jobs)), 1)
+    return workers
+
+def file_states(path):
+    """{file path: (size, mtime_ns)} for a file or every file under a directory; empty if the path does not exist."""
+    paths = [path] if os.path.isfile(path) else [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+    states = {}
+    for file_path in paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        states[file_path] = (stat.st_size, stat.st_mtime_ns)
+    return states
+
+def run_batch_job(index, job):
+    """Process-pool worker: runs one batch job; returns its result record.
+
+    Jobs keep their temporary files beside their outputs, like the CLI, so they need no scratch directory.
+    """
+    events = []
+    CURRENT_JOB.set(f"batch-{index}")
+    EVENT_SINK.set(events.append)
+    inputs = job.get('inputs', [])
+    inputs = inputs if isinstance(inputs, list) else [inputs]
+    input_bytes = sum(os.path.getsize(path) for path in inputs if os.path.isfile(path))
+    output = job.get('output')
+    # Files already in a decode job's output folder are not part of what it recovers.
+    output_before = file_states(output) if output else {}
+    start = time.perf_counter()
+    try:
+        code = run_cli(batch_job_argv(job))
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        report_error(f"Job failed: {e}")
+        code = 1
+    elapsed = time.perf_counter() - start
+    errors = [event['message'] for event in events if event['event'] == 'error']
+    progress = [event['message'] for event in events if event['event'] == 'progress']
+    last_message = progress[-1] if progress else ''
+    # Engine functions report most failures as a final "Error: ..." progress message rather than raising.
+    if last_message.startswith(('Error', 'An unexpected error')):
+        errors.append(last_message)
+    output_after = file_states(output) if output else {}
+    output_bytes = sum(size for size, _ in output_after.values())
+    # Decoding is measured by the files it recovers (written or rewritten by this job), not by the carrier it read.
+    written_bytes = sum(state[0] for path, state in output_after.items() if output_before.get(path) != state)
+    processed_bytes = written_bytes if job.get('mode') in ('decode', 'extract') else input_bytes
+    return {
+        'index': index,
+        'mode': job.get('mode', 'encode'),
+        'method': job.get('method'),
+        'output': output,
+        'ok': code == 0 and not errors,
+        'exit_code': code,
+        'seconds': round(elapsed, 3),
+        'input_bytes': input_bytes,
+        'output_bytes': output_bytes,
+        'processed_bytes': processed_bytes,
+        'mb_per_sec': round(processed_bytes / elapsed / 1e6, 3) if elapsed > 0 else None,
+        'message': errors[0] if errors else last_message,
+        'metrics': [{key: value for key, value in event.items() if key not in ('id', 'event')}
+                    for event in events if event['event'] == 'metric'],
+    }
+
+def run_batch(manifest_path, workers=None, summary_path=None):
+    """Runs every job in a batch manifest across a process pool; returns 0 if all succeeded, else 1."""
+    jobs = load_batch_manifest(manifest_path)
+    if not jobs:
+        report_error("Batch manifest contains no jobs.")
+        return 1
+    workers = batch_pool_size(jobs, workers)
+    report_progress(0, f"Running {len(jobs)} job(s) on {workers} worker(s)...")
+    results = [None] * len(jobs)
+    start = time.perf_counter()
+    with process_pool(workers) as pool:
+        futures = {pool.submit(run_batch_job, i, job): i for i, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'index': index, 'mode': jobs[index].get('mode', 'encode'), 'method': jobs[index].get('method'),
+                          'output': jobs[index].get('output'), 'ok': False, 'exit_code': 1, 'message': f"Worker crashed: {e}"}
+            results[index] = result
+            status = "OK" if result['ok'] else f"FAILED: {result['message']}"
+            report_progress(done / len(jobs) * 100, f"Job {index + 1}/{len(jobs)} ({result['mode']} {result['method']}) {status}")
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if not result['ok']]
+    total_bytes = sum(result.get('processed_bytes', 0) for result in results)
+    summary = {
+        'jobs': len(results),
+        'succeeded': len(results) - len(failed),
+        'failed': len(failed),
+        'workers': workers,
+        'seconds': round(elapsed, 3),
+        'processed_bytes': total_bytes,
+        'mb_per_sec': round(total_bytes / elapsed / 1e6, 3) if elapsed > 0 else None,
+        'results': results,
+    }
+    if summary_path:
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    report_progress(100, f"Batch complete: {summary['succeeded']}/{summary['jobs']} succeeded, {summary['failed']} failed, "
+                         f"{summary['mb_per_sec']} MB/s in {summary['seconds']}s.")
+    for result in failed:
+        report_error(f"Job {result['index'] + 1} failed: {result['message']}")
+    return 1 if failed else 0
+
+def frame_size(text):
+    """argparse type for WIDTHxHEIGHT frame sizes."""
+    try:
+        width, height = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got '{text}'")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"frame size must be positive, got '{text}'")
+    return width, height
 
-    parser = argparse.ArgumentParser(description="VideoVault Backend Engine")
+class EngineArgumentParser(argparse.ArgumentParser):
+    """ArgumentParser whose usage errors in --serve and batch jobs become error events, not stderr text."""
+
+    def error(self, message):
+        if CURRENT_JOB.get() is None:
+            super().error(message)
+        report_error(message)
+        sys.exit(2)
+
+def build_parser():
+    parser = EngineArgumentParser(description="VideoVault Backend Engine")
+    parser.add_argument('--serve', action='store_true', help="Run as a long-lived worker taking JSON job requests on stdin.")
     parser.add_argument('--method', choices=['append', 'steganography', 'datareel'])
-    parser.add_argument('--mode', required=True, choices=['encode', 'decode', 'ai'])
+    parser.add_argument('--mode', choices=['encode', 'decode', 'extract', 'list', 'plan', 'update', 'ai', 'batch'])
     parser.add_argument('--password', help="Password for the archive.")
     parser.add_argument('--output', help="Path for the output file or folder.")
     parser.add_argument('inputs', nargs='*', help="Input file paths.")
     parser.add_argument('--ai-task', choices=['password', 'peek'], help="The specific AI task to run.")
-    args = parser.parse_args()
+    parser.add_argument('--reel-size', type=frame_size, default=(640, 360), help="Data-Reel frame size as WIDTHxHEIGHT.")
+    parser.add_argument('--reel-bits', type=int, choices=[1, 2, 3, 4], default=2, help="Data-Reel bits per symbol.")
+    parser.add_argument('--reel-channels', type=int, choices=[1, 3], default=3, help="Data-Reel color channels (1 = grayscale, 3 = BGR).")
+    parser.add_argument('--level', type=int, choices=range(10), help="Deflate level for the hidden archive (0 = store only); defaults per method.")
+    parser.add_argument('--lsb-depth', type=int, choices=[1, 2, 3, 4], help="Steganography: low bits used per colour value (default 1; plan: every depth).")
+    parser.add_argument('--segments', type=int, default=1, help="Steganography: encode this many frame ranges in parallel processes (0 = one per core).")
+    parser.add_argument('--member', action='append', help="Decode/extract: archive member to extract (may be repeated).")
+    parser.add_argument('--remove', action='append', default=[], help="Update: vault member to delete (may be repeated).")
+    parser.add_argument('--workers', type=int, help="Batch: number of worker processes (default: sized to cores and memory).")
+    parser.add_argument('--metrics', action='store_true', help="Report per-stage timing, throughput and peak memory.")
+    return parser
+
+def run_cli(argv):
+    """Runs one engine command from its command-line arguments; returns the process exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.mode:
+        parser.error("--mode is required")
+    # Set either way: a --serve worker thread keeps its context from one job to the next.
+    METRICS.set(args.metrics)
+    if args.metrics:
+        # Resolved up front, so 'total' times the command the way a warm --serve worker runs it.
+        with measure_stage('imports'):
+            cv2.__version__, np.__version__
+    with measure_stage('total'):
+        return run_command(args)
 
+def run_command(args):
+    """Runs the command described by parsed arguments; returns the process exit code."""
     if args.mode == 'ai':
         if args.ai_task == 'password':
-            print(f"AI_RESULT:{get_ai_password()}")
+            report_result(get_ai_password())
         elif args.ai_task == 'peek':
             if not args.inputs:
-                print("ERROR: Peek requires an input video file.", file=sys.stderr)
-                sys.exit(1)
-            print(f"AI_RESULT:{peek_manifest_append(args.inputs[0])}")
+                report_error("Peek requires an input video file.")
+                return 1
+            report_result(peek_manifest_append(args.inputs[0]))
 
     elif args.mode == 'encode':
         if not args.inputs:
-            print("ERROR: Encoding requires at least one input file.", file=sys.stderr)
-            sys.exit(1)
+            report_error("Encoding requires at least one input file.")
+            return 1
         if not args.output:
-            print("ERROR: Encoding requires an output path.", file=sys.stderr)
-            sys.exit(1)
+            report_error("Encoding requires an output path.")
+            return 1
+        level = args.level if args.level is not None else DEFAULT_COMPRESSION_LEVELS.get(args.method, 6)
         if args.method == 'append':
-            encode_append(args.inputs[0], args.inputs[1:], args.output, args.password)
+            encode_append(args.inputs[0], args.inputs[1:], args.output, args.password, level)
         elif args.method == 'steganography':
-            encode_steganography(args.inputs[0], args.inputs[1:], args.output, args.password)
+            segments = args.segments if args.segments > 0 else (os.cpu_count() or 1)
+            encode_steganography(args.inputs[0], args.inputs[1:], args.output, args.password, level, segments, args.lsb_depth or 1)
         elif args.method == 'datareel':
-            encode_datareel(args.inputs, args.output, args.password)
+            encode_datareel(args.inputs, args.output, args.password, args.reel_size, args.reel_bits, args.reel_channels, level)
 
-    elif args.mode == 'decode':
+    elif args.mode == 'update':
+        if args.method != 'append':
+            report_error("Update is only supported for Append vaults.")
+            return 1
+        if not args.inputs or (len(args.inputs) == 1 and not args.remove):
+            report_error("Update requires a vault file and at least one file to add or --remove.")
+            return 1
+        level = args.level if args.level is not None else DEFAULT_COMPRESSION_LEVELS['append']
+        update_append(args.inputs[0], args.inputs[1:], args.password, args.remove, level)
+
+    elif args.mode == 'batch':
+        if len(args.inputs) != 1:
+            report_error("Batch mode requires exactly one job manifest (JSON or CSV).")
+            return 1
+        return run_batch(args.inputs[0], args.workers, args.output)
+
+    elif args.mode == 'plan':
+        if args.method != 'steganography':
+            report_error("Capacity planning is only available for the steganography method.")
+            return 1
+        if len(args.inputs) < 2:
+            report_error("Planning requires a carrier video and at least one file.")
+            return 1
+        plan_steganography(args.inputs[0], args.inputs[1:], args.lsb_depth)
+
+    elif args.mode == 'list':
+        if len(args.inputs) != 1:
+            report_error("Listing requires exactly one input video file.")
+            return 1
+        if args.method == 'append':
+            list_append(args.inputs[0])
+        elif args.method == 'steganography':
+            list_steganography(args.inputs[0])
+        elif args.method == 'datareel':
+            list_datareel(args.inputs[0])
+
+    elif args.mode in ('decode', 'extract'):
+        if args.mode == 'extract' and not args.member:
+            report_error("Extract requires at least one --member.")
+            return 1
         if not args.inputs or len(args.inputs) != 1:
-            print("ERROR: Decoding requires exactly one input video file.", file=sys.stderr)
-            sys.exit(1)
+            report_error("Decoding requires exactly one input video file.")
+            return 1
         if not args.output:
-            print("ERROR: Decoding requires an output path.", file=sys.stderr)
-            sys.exit(1)
+            report_error("Decoding requires an output path.")
+            return 1
         video_to_decode = args.inputs[0]
         if args.method == 'append':
-            decode_append(video_to_decode, args.output, args.password)
+            decode_append(video_to_decode, args.output, args.password, args.member)
         elif args.method == 'steganography':
-            decode_steganography(video_to_decode, args.output, args.password)
+            decode_steganography(video_to_decode, args.output, args.password, args.member)
         elif args.method == 'datareel':
-            decode_datareel(video_to_decode, args.output, args.password)
\ No newline at end of file
+            decode_datareel(video_to_decode, args.output, args.password, args.member)
+    return 0
+
+def run_job(job):
+    """Runs one --serve job on the current thread, tagging all of its output with the job ID."""
+    CURRENT_JOB.set(job.get('id', ''))
+    try:
+        code = run_cli([str(arg) for arg in job.get('args', [])])
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        report_error(f"Job failed: {e}")
+        code = 1
+    emit_event('done', code=code)
+
+def reject_job(job_id, message):
+    """Fails a --serve job that could not be started."""
+    CURRENT_JOB.set(job_id)
+    emit_event('error', message=message)
+    emit_event('done', code=2)
+
+def serve():
+    """Long-lived worker: reads {"id": ..., "args": [...]} JSON lines from stdin until it closes.
+
+    args are the same arguments the one-shot CLI takes. AI tasks (password, peek) run straight away on their
+    own thread; encode/decode jobs run one after another on a single worker thread.
+    """
+    jobs = queue.Queue()
+    worker = threading.Thread(target=lambda: [run_job(job) for job in iter(jobs.get, None)], daemon=True)
+    worker.start()
+    emit_event('ready', pid=os.getpid())
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            emit_event('error', message=f"Invalid job request: {e}")
+            continue
+        if not isinstance(job, dict) or not isinstance(job.get('args', []), list):
+            message = "Invalid job request: expected an object with an 'args' list."
+            if isinstance(job, dict) and 'id' in job:
+                # Answered under the job's ID, so its sender is not left waiting for a 'done'.
+                contextvars.copy_context().run(reject_job, job['id'], message)
+            else:
+                emit_event('error', message=message)
+            continue
+        args = [str(arg) for arg in job.get('args', [])]
+        if '--mode' in args[:-1] and args[args.index('--mode') + 1] == 'ai':
+            threading.Thread(target=run_job, args=(job,), daemon=True).start()
+        else:
+            jobs.put(job)
+    jobs.put(None)
+    worker.join()
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if '--serve' in sys.argv[1:]:
+        serve()
+    else:
+        sys.exit(run_cli(sys.argv[1:]))
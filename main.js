@@ -44,72 +44,144 @@ ipcMain.handle('dialog:saveFile', async (event, options) => {
     }
 });
 
-ipcMain.on('run-python', (event, args) => {
-    const isPackaged = app.isPackaged;
+let engineProc = null;
+let engineBuffer = '';
+let nextJobId = 1;
+const engineJobs = new Map();
 
-    const pythonExecutable = isPackaged
+function engineCommand(args) {
+    const isPackaged = app.isPackaged;
+    const pythonExecutable = isPackaged ? path.join(process.resourcesPath, 'engine.exe') : 'python';
+    const scriptPath = isPackaged ? '' : path.join(__dirname, 'backend', 'engine.py');
+    const allArgs = scriptPath ? [scriptPath, ...args] : args;
+    return { pythonExecutable, allArgs };
+}
 
-      ? path.join(process.resourcesPath, 'engine.exe')
-      : 'python';
+function handleEngineLine(line) {
+    let message;
+    try {
+        message = JSON.parse(line);
+    } catch (e) {
+        console.log(`Engine: ${line}`);
+        return;
+    }
+    const job = engineJobs.get(message.id);
+    if (!job) {
+        if (message.event === 'error') console.error(`Engine error: ${message.message}`);
+        return;
+    }
+    if (message.event === 'progress') {
+        job.onProgress(`PROGRESS:${message.percent}:${message.message}`);
+    } else if (message.event === 'result') {
+        job.onResult(message.result);
+    } else if (message.event === 'error') {
+        job.onError(message.message);
+    } else if (message.event === 'metric') {
+        console.log(`Engine metric [${message.id}]: ${JSON.stringify(message)}`);
+    } else if (message.event === 'done') {
+        engineJobs.delete(message.id);
+        job.onDone(message.code);
+    }
+}
 
-    const scriptPath = isPackaged
-      ? ''
-      : path.join(__dirname, 'backend', 'engine.py');
+function failEngineJobs(message, code) {
+    for (const job of engineJobs.values()) {
+        job.onError(message);
+        job.onDone(code);
+    }
+    engineJobs.clear();
+}
 
-    const allArgs = scriptPath ? [scriptPath, ...args] : args;
+// One long-lived engine process serves every job, so interpreter start-up and imports are paid once.
+function getEngine() {
+    if (engineProc) return engineProc;
+
+    const { pythonExecutable, allArgs } = engineCommand(['--serve']);
+    console.log(`Starting engine: ${pythonExecutable} ${allArgs.join(' ')}`);
+    const proc = spawn(pythonExecutable, allArgs);
+    engineProc = proc;
+    engineBuffer = '';
+
+    // Raised when the engine cannot be started (e.g. Python is missing) or killed; 'close' may not follow.
+    proc.on('error', (err) => {
+        console.error(`Engine process error: ${err.message}`);
+        if (engineProc === proc) engineProc = null;
+        failEngineJobs(`Could not run the engine: ${err.message}`, 1);
+    });
 
-    console.log(`Running command: ${pythonExecutable} ${allArgs.join(' ')}`);
+    // Writing a job to an engine that has just exited fails with EPIPE; 'close' then fails its jobs.
+    proc.stdin.on('error', (err) => {
+        console.error(`Engine stdin error: ${err.message}`);
+    });
 
-    const pyProc = spawn(pythonExecutable, allArgs);
+    proc.stdout.on('data', (data) => {
+        engineBuffer += data.toString();
+        let newline;
+        while ((newline = engineBuffer.indexOf('\n')) !== -1) {
+            const line = engineBuffer.slice(0, newline).trim();
+            engineBuffer = engineBuffer.slice(newline + 1);
+            if (line) handleEngineLine(line);
+        }
+    });
 
-    pyProc.stdout.on('data', (data) => {
-        const message = data.toString();
-        event.sender.send('python-progress', message);
+    proc.stderr.on('data', (data) => {
+        console.error(`Engine stderr: ${data.toString()}`);
     });
 
-    pyProc.stderr.on('data', (data) => {
-        const errorMessage = `ERROR: ${data.toString()}`;
-        console.error(errorMessage);
-        event.sender.send('python-progress', errorMessage);
+    proc.on('close', (code) => {
+        console.log(`Engine process exited with code ${code}`);
+        if (engineProc === proc) engineProc = null;
+        failEngineJobs(`Engine exited unexpectedly (code ${code}).`, code || 1);
     });
 
-    pyProc.on('close', (code) => {
-        console.log(`Python process exited with code ${code}`);
-        event.sender.send('python-done', code);
+    return proc;
+}
+
+function runEngineJob(args, handlers) {
+    const id = String(nextJobId++);
+    engineJobs.set(id, handlers);
+    console.log(`Engine job ${id}: ${args.join(' ')}`);
+    getEngine().stdin.write(JSON.stringify({ id, args }) + '\n');
+}
+
+app.on('will-quit', () => {
+    if (engineProc) engineProc.stdin.end();
+});
+
+ipcMain.on('run-python', (event, args) => {
+    runEngineJob(args, {
+        onProgress: (message) => event.sender.send('python-progress', message),
+        onResult: (result) => event.sender.send('python-progress', result),
+        onError: (message) => {
+            const errorMessage = `ERROR: ${message}`;
+            console.error(errorMessage);
+            event.sender.send('python-progress', errorMessage);
+        },
+        onDone: (code) => {
+            console.log(`Engine job finished with code ${code}`);
+            event.sender.send('python-done', code);
+        },
     });
 });
 
 ipcMain.handle('run-ai-task', (event, args) => {
     return new Promise((resolve, reject) => {
-        const isPackaged = app.isPackaged;
-        const pythonExecutable = isPackaged ? path.join(process.resourcesPath, 'engine.exe') : 'python';
-        const scriptPath = isPackaged ? '' : path.join(__dirname, 'backend', 'engine.py');
-        
-        const allArgs = scriptPath ? [scriptPath, ...args] : args;
-        console.log(`Running AI command: ${pythonExecutable} ${allArgs.join(' ')}`);
-
-        const pyProc = spawn(pythonExecutable, allArgs);
-        
         let result = '';
-        pyProc.stdout.on('data', (data) => {
-            result += data.toString();
-        });
-
-        pyProc.stderr.on('data', (data) => {
-            console.error(`AI Task Error: ${data}`);
-            reject(data.toString());
-        });
-
-        pyProc.on('close', (code) => {
-            if (code === 0) {
-                if (result.startsWith('AI_RESULT:')) {
-                    resolve(result.substring(10));
-                } else {
+        let error = '';
+        runEngineJob(args, {
+            onProgress: () => {},
+            onResult: (text) => { result = text; },
+            onError: (message) => {
+                console.error(`AI Task Error: ${message}`);
+                error = message;
+            },
+            onDone: (code) => {
+                if (code === 0 && !error) {
                     resolve(result);
+                } else {
+                    reject(error || `AI Task process exited with code ${code}`);
                 }
-            } else {
-                reject(`AI Task process exited with code ${code}`);
-            }
+            },
         });
     });
-});
\ No newline at end of file
+});